@@ -0,0 +1,87 @@
+# Benchmark suite.
+# Cases are registered with `benchmark` decorator and run by `python -m benchmarks.run`
+import os
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+import django
+
+
+class Result(NamedTuple):
+    name: str
+    number: int
+    ops: float
+    mean_us: float
+    p50_us: float
+    p95_us: float
+    p99_us: float
+
+    def to_dict(self):
+        return self._asdict()
+
+
+BENCHMARKS: Dict[str, Callable[[bool], List[Result]]] = {}
+_is_setup = False
+
+
+def setup():
+    global _is_setup
+    if _is_setup:
+        return
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    django.setup()
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+    _is_setup = True
+
+
+def benchmark(func: Callable[[bool], List[Result]]):
+    # Case receives `full` flag and returns measured results
+    BENCHMARKS[f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"] = func
+    return func
+
+
+def percentile(timings: List[float], percent: float) -> float:
+    return timings[min(len(timings) - 1, int(len(timings) * percent / 100))]
+
+
+def measure(name: str, func: Callable[[], None], number: int, warmup: int = None) -> Result:
+    for _ in range(min(number, 100) if warmup is None else warmup):
+        func()
+    timings = []
+    clock = time.perf_counter
+    for _ in range(number):
+        started = clock()
+        func()
+        timings.append(clock() - started)
+    total = sum(timings)
+    timings.sort()
+    return Result(
+        name=name,
+        number=number,
+        ops=number / total if total else float("inf"),
+        mean_us=total / number * 1e6,
+        p50_us=percentile(timings, 50) * 1e6,
+        p95_us=percentile(timings, 95) * 1e6,
+        p99_us=percentile(timings, 99) * 1e6,
+    )
+
+
+def format_result(result: Result) -> str:
+    return (
+        f"{result.name:<40} {result.number:>7} {result.ops:>12.1f} "
+        f"{result.mean_us:>10.2f} {result.p50_us:>10.2f} {result.p95_us:>10.2f} {result.p99_us:>10.2f}"
+    )
+
+
+HEADER = f"{'name':<40} {'n':>7} {'ops/sec':>12} {'mean us':>10} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10}"
+
+
+def main(*cases: Callable[[bool], List[Result]], full: bool = False) -> List[Result]:
+    print(HEADER)
+    results = []
+    for case in cases:
+        for result in case(full):
+            print(format_result(result))
+            results.append(result)
+    return results
@@ -0,0 +1,66 @@
+# Getting values with CacheWorker, compared with plain `cache.get`.
+# Run: python -m benchmarks.hit
+from itertools import count
+
+from . import benchmark, measure, main, setup
+
+setup()
+
+from django.core.cache import cache  # noqa: E402
+
+from django_cache.contrib import CacheWorker  # noqa: E402
+
+
+def get_value(**kwargs):
+    return list(range(10))
+
+
+def get_values(arguments):
+    return [get_value(**kwargs) for kwargs in arguments]
+
+
+worker = CacheWorker(
+    structure_getter=get_value,
+    many_structure_getter=get_values,
+    label="bench_hit",
+    expires=600,
+    is_register=False
+)
+
+
+@benchmark
+def hit(full: bool):
+    number = 100000 if full else 20000
+    kwargs = dict(attr1=1, attr2="test")
+    worker.get(**kwargs)
+    key = worker.get_key(**kwargs)
+    return [
+        measure("cache.get", lambda: cache.get(key), number),
+        measure("CacheWorker.get_key", lambda: worker.get_key(**kwargs), number),
+        measure("CacheWorker.get[hit]", lambda: worker.get(**kwargs), number),
+    ]
+
+
+@benchmark
+def hit_many(full: bool):
+    number = 2000 if full else 500
+    arguments = [dict(attr1=i, attr2="test") for i in range(100)]
+    worker.get_many(arguments)
+    return [measure("CacheWorker.get_many[hit, 100 keys]", lambda: worker.get_many(arguments), number)]
+
+
+@benchmark
+def miss(full: bool):
+    # Every call builds new key, value is logged in database
+    number = 2000 if full else 500
+    counter = count()
+    return [
+        measure("CacheWorker.get[miss]", lambda: worker.get(attr1=next(counter), attr2="miss"), number),
+        measure("CacheWorker.get_many[miss, 100 keys]", lambda: worker.get_many([
+            dict(attr1=next(counter), attr2="miss") for _ in range(100)
+        ]), number // 50),
+    ]
+
+
+if __name__ == "__main__":
+    main(hit, hit_many, miss)
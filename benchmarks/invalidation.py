@@ -0,0 +1,91 @@
+# Invalidation filters and `invalidate_process` with growing count of logs.
+# Run: python -m benchmarks.invalidation
+from datetime import datetime, timedelta
+
+from . import benchmark, measure, main, setup
+
+setup()
+
+from django_cache.contrib import CacheWorker  # noqa: E402
+from django_cache.contrib.invalidation import get_created_cache, invalidate_process  # noqa: E402
+from django_cache.contrib.rebuild import chunked  # noqa: E402
+from django_cache.contrib.save import CachedEntity, log_cache_values  # noqa: E402
+from django_cache.models import CreatedCache  # noqa: E402
+
+
+def get_value(**kwargs):
+    return kwargs
+
+
+def get_worker(rows: int) -> CacheWorker:
+    return CacheWorker(
+        structure_getter=get_value,
+        label=f"bench_invalidation_{rows}",
+        expires=600,
+        is_register=False
+    )
+
+
+def fill_logs(worker: CacheWorker, rows: int):
+    if CreatedCache.objects.filter(label=worker.label).exists():
+        return
+    now = datetime.now()
+    for batch in chunked(range(rows), 1000):
+        log_cache_values([
+            (
+                CachedEntity(
+                    label=worker.label,
+                    key=worker.get_key(**kwargs),
+                    expires=600,
+                    is_relevance_invalidation=False,
+                    created_at=now,
+                    relevance_to=now + timedelta(seconds=60),
+                    available_to=now + timedelta(seconds=600),
+                    value=None,
+                ),
+                kwargs
+            )
+            for kwargs in (dict(attr1=i, attr2="test", ids=[i, i + 1]) for i in batch)
+        ])
+
+
+@benchmark
+def attributes_filter(full: bool):
+    results = []
+    for size in (1, 5, 20):
+        outdated = {f"attr{i}": i for i in range(size)}
+        newcomers = {f"attr{i}": i + 1 for i in range(size)}
+
+        results.append(measure(
+            f"attributes_filter[{size} attrs]",
+            # Build and compile query
+            lambda: str(get_created_cache("bench", outdated, newcomers).query),
+            1000 if full else 200
+        ))
+    return results
+
+
+@benchmark
+def invalidation(full: bool):
+    results = []
+    for rows in ((1000, 10000, 100000) if full else (1000, 10000)):
+        worker = get_worker(rows)
+        fill_logs(worker, rows)
+        # One of rows is matched and rebuilt
+        results.append(measure(
+            f"invalidate_process[{rows} rows]",
+            lambda: invalidate_process(worker, {"attr1": rows // 2}, {"attr1": rows + 1}),
+            50 if full else 20,
+            warmup=1,
+        ))
+        results.append(measure(
+            f"get_created_cache.count[{rows} rows]",
+            lambda: get_created_cache(worker.label, {"ids": [rows // 2]}).count(),
+            50 if full else 20,
+            warmup=1,
+        ))
+    return results
+
+
+if __name__ == "__main__":
+    main(attributes_filter, invalidation)
@@ -0,0 +1,39 @@
+# Key generation functions.
+# Run: python -m benchmarks.keygen
+from . import benchmark, measure, main, setup
+
+setup()
+
+from django_cache.contrib.keygen import keygen, typed_keygen, hashed_keygen  # noqa: E402
+
+
+CASES = {
+    "small": ((), dict(attr1=1, attr2="test", attr3=1.1)),
+    "positional": ((1, "test", 1.1), {}),
+    "list": ((), dict(ids=list(range(100)), attr2="test")),
+    "long list": ((), dict(ids=list(range(10000)))),
+}
+KEYGENS = {
+    "keygen": keygen,
+    "typed_keygen": typed_keygen,
+    "hashed_keygen": hashed_keygen,
+}
+
+
+@benchmark
+def key_generation(full: bool):
+    results = []
+    for case, (args, kwargs) in CASES.items():
+        number = 10000 if len(repr(kwargs)) < 1000 else 100
+        for name, func in KEYGENS.items():
+            try:
+                func(*args, **kwargs)
+            except TypeError:
+                # Original keygen sorts positional arguments
+                continue
+            results.append(measure(f"{name}[{case}]", lambda: func(*args, **kwargs), number))
+    return results
+
+
+if __name__ == "__main__":
+    main(key_generation)
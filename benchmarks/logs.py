@@ -0,0 +1,53 @@
+# Writing CreatedCache logs.
+# Run: python -m benchmarks.logs
+from datetime import datetime, timedelta
+from itertools import count
+
+from . import benchmark, measure, main, setup
+
+setup()
+
+from django_cache.contrib.save import CachedEntity, log_cache_value, log_cache_values  # noqa: E402
+
+
+counter = count()
+
+
+def build_entity(key: str) -> CachedEntity:
+    now = datetime.now()
+    return CachedEntity(
+        label="bench_logs",
+        key=key,
+        expires=600,
+        is_relevance_invalidation=False,
+        created_at=now,
+        relevance_to=now + timedelta(seconds=60),
+        available_to=now + timedelta(seconds=600),
+        value=None,
+    )
+
+
+def log_one():
+    i = next(counter)
+    entity = build_entity(f"bench_logs@{i}")
+    log_cache_value(**entity.get_info(), attr1=i, attr2="test", ids=[1, 2, 3])
+
+
+def log_many():
+    log_cache_values([
+        (build_entity(f"bench_logs@{i}"), dict(attr1=i, attr2="test", ids=[1, 2, 3]))
+        for i in (next(counter) for _ in range(100))
+    ])
+
+
+@benchmark
+def logging(full: bool):
+    number = 5000 if full else 1000
+    return [
+        measure("log_cache_value", log_one, number),
+        measure("log_cache_values[100]", log_many, number // 50),
+    ]
+
+
+if __name__ == "__main__":
+    main(logging)
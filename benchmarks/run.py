@@ -0,0 +1,72 @@
+# Run benchmark suite, save and compare baselines.
+#
+#   python -m benchmarks.run --save baseline.json
+#   python -m benchmarks.run --compare baseline.json
+#   BENCHMARK_CACHE=file python -m benchmarks.run --full -k hit
+import argparse
+import json
+import platform
+import sys
+
+import django
+
+from . import BENCHMARKS, main
+from . import keygen, hit, logs, invalidation  # noqa: F401
+
+
+def get_meta(args) -> dict:
+    from django.conf import settings
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "machine": platform.machine(),
+        "cache": settings.CACHES["default"]["BACKEND"],
+        "database": settings.DATABASES["default"]["ENGINE"],
+        "full": args.full,
+    }
+
+
+def compare(results, baseline: dict, threshold: float) -> bool:
+    # Compare median latency, slower than threshold is regression
+    is_regression = False
+    previous = baseline["results"]
+    print(f"\n{'name':<40} {'baseline p50':>12} {'p50':>10} {'ratio':>7}")
+    for result in results:
+        if result.name not in previous:
+            continue
+        ratio = result.p50_us / previous[result.name]["p50_us"]
+        mark = ""
+        if ratio > threshold:
+            is_regression = True
+            mark = "REGRESSION"
+        print(f"{result.name:<40} {previous[result.name]['p50_us']:>12.2f} {result.p50_us:>10.2f} {ratio:>7.2f} {mark}")
+    return is_regression
+
+
+def run(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="django_cache benchmarks")
+    parser.add_argument("-k", "--filter", default="", help="Run cases which names contain substring")
+    parser.add_argument("--full", action="store_true", help="More iterations and 10^5 rows for invalidation")
+    parser.add_argument("--save", help="Save results as json baseline")
+    parser.add_argument("--compare", help="Compare results with json baseline")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Max allowed p50 ratio")
+    args = parser.parse_args(argv)
+
+    cases = [case for name, case in BENCHMARKS.items() if args.filter in name]
+    results = main(*cases, full=args.full)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": get_meta(args),
+                "results": {result.name: result.to_dict() for result in results},
+            }, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
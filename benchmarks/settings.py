@@ -0,0 +1,34 @@
+# Offline settings for benchmarks: SQLite and local memory or file cache
+import atexit
+import os
+import shutil
+import tempfile
+
+from django_cache.tests.settings import *  # noqa
+
+BENCHMARK_DIR = tempfile.mkdtemp(prefix="django_cache_benchmark_")
+atexit.register(shutil.rmtree, BENCHMARK_DIR, True)
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        # File database, so rebuild threads share it
+        'NAME': os.path.join(BENCHMARK_DIR, 'db.sqlite3'),
+    }
+}
+
+CACHES = {
+    'locmem': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 1000000},
+        }
+    },
+    'file': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(BENCHMARK_DIR, 'cache'),
+            'OPTIONS': {'MAX_ENTRIES': 1000000},
+        }
+    },
+}[os.environ.get('BENCHMARK_CACHE', 'locmem')]
@@ -6,10 +6,14 @@ from .contrib.registration import workers_collection
 
 
 def invalidate_action(modeladmin, request, queryset):
+    invalidated_workers = set()
     for created_cache in queryset:
         worker = workers_collection.get(created_cache.label)
         if worker:
             invalidate_created_caches(created_cache, worker)
+            invalidated_workers.add(worker)
+    for worker in invalidated_workers:
+        worker.clear_local()
 
 
 @admin.register(CreatedCache)
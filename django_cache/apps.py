@@ -5,3 +5,13 @@ from django.utils.translation import ugettext_lazy as _
 class DjangoCacheConfig(AppConfig):
     name = 'django_cache'
     verbose_name = _('Cache')
+
+    def ready(self):
+        from django.core.signals import request_finished
+        from .contrib import settings as default
+        from .contrib.save import flush_cache_logs
+        from .contrib.metrics import setup_observers
+
+        if default.LOG_BUFFER_FLUSH_ON_REQUEST_END:
+            request_finished.connect(flush_cache_logs, dispatch_uid="django_cache_flush_logs")
+        setup_observers()
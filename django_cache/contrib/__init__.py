@@ -1,5 +1,5 @@
 from .cache import CacheWorker
-from .invalidation import invalidate, invalidate_all
+from .invalidation import invalidate, invalidate_all, ainvalidate, ainvalidate_all
 from .registration import workers_collection
 from .automatic import (
     automatic_invalidation,
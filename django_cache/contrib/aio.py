@@ -0,0 +1,12 @@
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+
+async def acache(method: str, *args, **kwargs) -> Any:
+    # Native async cache API is available since django 4.0
+    async_method = getattr(cache, f"a{method}", None)
+    if async_method is not None:
+        return await async_method(*args, **kwargs)
+    return await sync_to_async(getattr(cache, method), thread_sensitive=False)(*args, **kwargs)
@@ -0,0 +1,128 @@
+import json
+from collections import defaultdict
+from functools import reduce
+from hashlib import blake2b
+from operator import and_, or_
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from django.db.models import Q
+
+from ..models import CreatedCache, CreatedCacheAttribute
+
+
+MAX_VALUE_LENGTH = 255
+
+
+def normalize_attribute_value(value: Any) -> str:
+    # Same values must be equal in filter, 1 and 1.0 as well
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    normalized = json.dumps(value, sort_keys=True, default=str)
+    if len(normalized) > MAX_VALUE_LENGTH:
+        return "#" + blake2b(normalized.encode(), digest_size=32).hexdigest()
+    return normalized
+
+
+def get_attribute_values(value: Any) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def get_attribute_rows(label: str, attributes: Dict) -> FrozenSet[Tuple[str, str, str]]:
+    filterable_kwargs = (attributes or {}).get("filterable_kwargs") or {}
+    return frozenset(
+        (label, name, normalize_attribute_value(value))
+        for name, values in filterable_kwargs.items()
+        for value in get_attribute_values(values)
+    )
+
+
+def get_logged_attributes(keys: Iterable[str]) -> Dict[str, Tuple[int, FrozenSet]]:
+    # Ids and attribute rows of logs before upsert, by one query
+    return {
+        key: (cache_log_id, get_attribute_rows(label, attributes))
+        for key, cache_log_id, label, attributes in (
+            CreatedCache.objects
+            .filter(key__in=keys)
+            .values_list("key", "id", "label", "attributes")
+        )
+    }
+
+
+def log_cache_attributes(cache_logs: List[CreatedCache], logged: Dict[str, Tuple[int, FrozenSet]]):
+    # Upsert keeps ids of logged keys, so rows are rewritten only for new keys and changed attributes
+    changed = {}
+    for cache_log in cache_logs:
+        rows = get_attribute_rows(cache_log.label, cache_log.attributes)
+        cache_log_id, logged_rows = logged.get(cache_log.key, (None, None))
+        if rows != logged_rows:
+            changed[cache_log.key] = (cache_log.id or cache_log_id, rows)
+    if not changed:
+        return
+    # Ids of inserted logs are not returned by upsert
+    missed = [key for key, (cache_log_id, _) in changed.items() if cache_log_id is None]
+    ids = dict(CreatedCache.objects.filter(key__in=missed).values_list("key", "id")) if missed else {}
+    outdated = [logged[key][0] for key in changed if key in logged]
+    if outdated:
+        CreatedCacheAttribute.objects.filter(created_cache_id__in=outdated).delete()
+    CreatedCacheAttribute.objects.bulk_create([
+        CreatedCacheAttribute(created_cache_id=cache_log_id or ids[key], label=label, name=name, value=value)
+        for key, (cache_log_id, rows) in changed.items() if cache_log_id or key in ids
+        for label, name, value in rows
+    ])
+
+
+def get_attributes_groups(outdated: Dict, newcomers: Dict = None) -> List[Dict[str, Any]]:
+    if not newcomers:
+        return [outdated]
+    changed = [key for key, value in newcomers.items() if value != outdated.get(key)]
+    if not changed:
+        return []
+    return [
+        {key: outdated.get(key) for key in changed},
+        {key: newcomers.get(key) for key in changed},
+    ]
+
+
+def build_attributes_filter(label: str, attributes: Dict[str, Any]) -> Q:
+    # Every attribute must contain value or must be absent
+    attributes_filter = Q()
+    for name, value in attributes.items():
+        named = CreatedCacheAttribute.objects.filter(label=label, name=name)
+        is_absent = ~Q(id__in=named.values("created_cache_id"))
+        if value is None:
+            attributes_filter &= is_absent
+            continue
+        values = get_attribute_values(value)
+        if not values:
+            continue
+        is_contained = reduce(and_, [
+            Q(id__in=named.filter(value=normalize_attribute_value(item)).values("created_cache_id"))
+            for item in values
+        ])
+        attributes_filter &= is_contained | is_absent
+    return attributes_filter
+
+
+def build_attributes_filter_groups(label: str, groups: Iterable[Dict[str, Any]]) -> Q:
+    # Any group must match. Groups with one value of one attribute are merged
+    # into single `IN` lookup by attribute name, same groups are built once.
+    merged: Dict[str, Set[str]] = defaultdict(set)
+    filters = {}
+    for group in groups:
+        if len(group) == 1:
+            name, value = next(iter(group.items()))
+            values = get_attribute_values(value) if value is not None else []
+            if len(values) == 1:
+                merged[name].add(normalize_attribute_value(values[0]))
+                continue
+        key = json.dumps(group, sort_keys=True, default=str)
+        if key not in filters:
+            filters[key] = build_attributes_filter(label, group)
+    attributes_filters = list(filters.values())
+    for name, values in merged.items():
+        named = CreatedCacheAttribute.objects.filter(label=label, name=name)
+        attributes_filters.append(
+            Q(id__in=named.filter(value__in=values).values("created_cache_id"))
+            | ~Q(id__in=named.values("created_cache_id"))
+        )
+    return reduce(or_, attributes_filters)
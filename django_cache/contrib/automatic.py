@@ -1,11 +1,18 @@
 from typing import (
-    Optional, Callable, Iterable, Union, Tuple, Dict, List, Type
+    Any, Optional, Callable, Iterable, Union, Tuple, Dict, List, Type, Set
 )
 from dataclasses import dataclass
 from collections import defaultdict
+from contextlib import contextmanager
+from copy import copy
 from functools import partial
 from enum import IntEnum
+import json
+import threading
+import weakref
 
+from django.db import transaction
+from django.db.models import QuerySet
 from django.utils.module_loading import import_string
 
 from model_subscription.decorators import subscribe
@@ -13,30 +20,186 @@ from model_subscription.constants import OperationType
 
 from .registration import workers_collection
 from .cache import CacheWorker
-from .invalidation import invalidate
+from .invalidation import invalidate, invalidate_many, invalidate_tags, apply_deltas
+from .delta import CREATE, UPDATE, DELETE, detach_instance
+from .tags import Tag, get_instance_tag, get_model_tag
+from . import settings as default
 
 
-def ready_to_invalidation(instance, *args, **kwargs):
+class PendingInvalidation:
+    # Changes collected by worker label, deduplicated and invalidated
+    # by one query per worker after transaction commit
+    workers: Dict[str, CacheWorker]
+    changes: Dict[str, Dict[str, Tuple[Optional[Dict], Optional[Dict]]]]
+    invalidate_all: Set[str]
+    deltas: Dict[str, List[Tuple[Optional[Dict], Optional[Dict], Any, str]]]
+    tags: Set[Tag]
+    scheduled: Optional[weakref.ref]
+
+    def __init__(self):
+        self.workers = {}
+        self.changes = defaultdict(dict)
+        self.invalidate_all = set()
+        self.deltas = defaultdict(list)
+        self.tags = set()
+        self.scheduled = None
+
+    def add(self, worker: CacheWorker, outdated: Dict = None, newcomers: Dict = None):
+        self.workers[worker.label] = worker
+        if not outdated:
+            self.invalidate_all.add(worker.label)
+            return
+        key = json.dumps([outdated, newcomers], sort_keys=True, default=str)
+        self.changes[worker.label][key] = (outdated, newcomers)
+
+    def add_delta(
+        self, worker: CacheWorker, outdated: Optional[Dict], newcomers: Optional[Dict], instance, operation: str
+    ):
+        # Instance is copied in state of change
+        self.workers[worker.label] = worker
+        self.deltas[worker.label].append((outdated, newcomers, detach_instance(instance), operation))
+
+    def add_tags(self, *tags: Tag):
+        self.tags.update(tags)
+
+    def schedule(self):
+        callback = ScheduledFlush(self)
+        self.scheduled = weakref.ref(callback)
+        transaction.on_commit(callback)
+
+    def is_scheduled(self) -> bool:
+        # Callback of rolled back transaction or savepoint is dropped by django,
+        # so scheduling is reset with its collection
+        return self.scheduled is not None and self.scheduled() is not None
+
+    def flush(self):
+        self.scheduled = None
+        if getattr(_state, "pending", None) is self:
+            _state.pending = None
+        for label, worker in self.workers.items():
+            if label in self.invalidate_all:
+                # All values are rebuilt, other changes are included
+                invalidate(worker)
+                continue
+            changes = list(self.changes[label].values())
+            if len(changes) == 1:
+                invalidate(worker, *changes[0])
+            elif changes:
+                invalidate_many(worker, changes)
+            if self.deltas[label]:
+                apply_deltas(worker, self.deltas[label])
+        if self.tags:
+            invalidate_tags(*self.tags)
+
+
+class ScheduledFlush:
+    # Commit callback, only django holds it
+    __slots__ = ("pending", "__weakref__")
+
+    def __init__(self, pending: PendingInvalidation):
+        self.pending = pending
+
+    def __call__(self):
+        self.pending.flush()
+
+
+_state = threading.local()
+
+
+@contextmanager
+def coalesced_invalidation():
+    # Collect invalidations of all handlers called inside, flush them on commit
+    # (right away in autocommit mode) or with exit when ON_COMMIT is disabled
+    depth = getattr(_state, "depth", 0)
+    pending = getattr(_state, "pending", None)
+    if not depth and (pending is None or not pending.is_scheduled()):
+        # Changes of rolled back transaction are dropped
+        pending = _state.pending = PendingInvalidation()
+    _state.depth = depth + 1
+    try:
+        yield pending
+    finally:
+        _state.depth = depth
+    if depth or not (pending.workers or pending.tags):
+        return
+    if not default.AUTOMATIC_INVALIDATION_ON_COMMIT:
+        pending.flush()
+    elif not pending.is_scheduled():
+        pending.schedule()
+
+
+def ready_to_invalidation(pending: PendingInvalidation, operation: str, instance, *args, **kwargs):
+    if instance.__class__ in automatic_invalidation.tagged:
+        pending.add_tags(get_instance_tag(instance), get_model_tag(instance.__class__))
     for item in automatic_invalidation.get(instance.__class__):  # type: InvalidationWorker
         if not item.is_invalidate or item.is_invalidate(instance, *args, **kwargs):
-            if item.is_empty:
-                invalidate(item.worker)
-            else:
+            if not item.is_empty:
                 yield item
+            elif item.worker.apply_delta:
+                pending.add_delta(item.worker, None, None, instance, operation)
+            else:
+                pending.add(item.worker)
+
+
+def update_exists(instance, operation: str = CREATE):
+    with coalesced_invalidation() as pending:
+        for item in ready_to_invalidation(pending, operation, instance):
+            if item.worker.apply_delta:
+                pending.add_delta(item.worker, item.instance_getter(instance), None, instance, operation)
+            else:
+                pending.add(item.worker, item.instance_getter(instance))
 
 
-def update_exists(instance):
-    for item in ready_to_invalidation(instance):
-        invalidate(item.worker, item.instance_getter(instance))
+def delete_exists(instance):
+    if instance.pk is None and hasattr(instance, "initial_value"):
+        # Deleted instance has no primary key already
+        instance = copy(instance)
+        instance.pk = instance.initial_value(instance._meta.pk.attname)
+    update_exists(instance, DELETE)
 
 
 def invalidate_changed(instance, attrs):
-    for item in ready_to_invalidation(instance, attrs):
-        invalidate(
-            item.worker,
-            item.outdated_getter(instance, attrs),
-            item.newcomers_getter(instance, attrs)
-        )
+    with coalesced_invalidation() as pending:
+        for item in ready_to_invalidation(pending, UPDATE, instance, attrs):
+            outdated = item.outdated_getter(instance, attrs)
+            newcomers = item.newcomers_getter(instance, attrs)
+            if item.worker.apply_delta:
+                pending.add_delta(item.worker, outdated, newcomers, instance, UPDATE)
+            else:
+                pending.add(item.worker, outdated, newcomers)
+
+
+def update_bulk_exists(instances: Iterable, operation: str = CREATE):
+    # Bulk create gets list, bulk delete gets queryset before deleting
+    with coalesced_invalidation():
+        for instance in instances:
+            update_exists(instance, operation)
+
+
+def delete_bulk_exists(instances: QuerySet):
+    update_bulk_exists(instances, DELETE)
+
+
+def invalidate_bulk_changed(instances: QuerySet):
+    # Bulk update has no changes diff and old values can't be found,
+    # so workers are invalidated entirely, once per transaction
+    with coalesced_invalidation() as pending:
+        if instances.model in automatic_invalidation.tagged:
+            # Rows which don't match queryset after update are covered by model tag only
+            pending.add_tags(get_model_tag(instances.model), *(
+                (instances.model._meta.label, pk) for pk in instances.values_list("pk", flat=True)
+            ))
+        items = automatic_invalidation.get(instances.model)
+        for item in items:
+            if not item.is_invalidate:
+                pending.add(item.worker)
+        checked = [item for item in items if item.is_invalidate]
+        if not checked:
+            return
+        for instance in instances:
+            for item in checked:
+                if item.worker.label not in pending.invalidate_all and item.is_invalidate(instance):
+                    pending.add(item.worker)
 
 
 class ChangedAttributesTypes(IntEnum):
@@ -76,11 +239,11 @@ default_newcomers_getter = partial(attribute_getter, data_type=ChangedAttributes
 
 def subscribe_actions(model):
     subscribe(OperationType.CREATE, model)(update_exists)
-    subscribe(OperationType.BULK_CREATE, model)(update_exists)
+    subscribe(OperationType.BULK_CREATE, model)(update_bulk_exists)
     subscribe(OperationType.UPDATE, model)(invalidate_changed)
-    subscribe(OperationType.BULK_UPDATE, model)(invalidate_changed)
-    subscribe(OperationType.DELETE, model)(update_exists)
-    subscribe(OperationType.BULK_DELETE, model)(update_exists)
+    subscribe(OperationType.BULK_UPDATE, model)(invalidate_bulk_changed)
+    subscribe(OperationType.DELETE, model)(delete_exists)
+    subscribe(OperationType.BULK_DELETE, model)(delete_bulk_exists)
 
 
 @dataclass
@@ -109,9 +272,18 @@ def get_func_or_import_from_string(value: Union[str, Callable], is_empty=False):
 
 class AutomaticInvalidationPool:
     pool: Dict[Type, List[InvalidationWorker]]
+    tagged: Set[Type]
+    subscribed: Set[Type]
 
     def __init__(self):
         self.pool = defaultdict(list)
+        self.tagged = set()
+        self.subscribed = set()
+
+    def subscribe(self, model):
+        if model not in self.subscribed:
+            self.subscribed.add(model)
+            subscribe_actions(model)
 
     def register(self, model, invalidation_items: Dict):
         for worker_name, getters in invalidation_items.items():
@@ -143,7 +315,12 @@ class AutomaticInvalidationPool:
                         getters.get("is_invalidate", None), True
                     ),
                 ))
-        subscribe_actions(model)
+        self.subscribe(model)
+
+    def register_tags(self, model):
+        # Changed instance invalidates values tagged by it and by its model
+        self.tagged.add(model)
+        self.subscribe(model)
 
     def get(self, model):
         return self.pool.get(model, [])
@@ -1,16 +1,48 @@
-from typing import Callable, Union, Any, Generator, NamedTuple
+from typing import Callable, Union, Any, Generator, AsyncGenerator, NamedTuple, Iterable, Dict, List, Optional
+import asyncio
+import math
+import random
 import time
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
 
-from .save import cache_value, CachedEntity
+from .aio import acache
+from .save import cache_value, cache_values, log_entity, CachedEntity
+from .lock import SingleFlightLock, release_many
+from .revalidation import revalidate
+from .local import LocalCache
+from .codecs import DictCodec, get_codec
+from .keygen import get_keygen
+from .tags import collect_tags, register_tags
+from .delta import Delta, get_delta
+from .materialization import IDS, materialize, dematerialize, dematerialize_many
+from .metrics import observers, observe, timed, HIT, MISS, WAIT, STALE, EARLY_REFRESH
 from . import settings as default
 
 
-def get_precache_key(key):
-    return f"{key}||PRECACHE"
+# Invalidation strategies
+REBUILD = "rebuild"
+DELETE = "delete"
+REBUILD_IF_HOT = "rebuild_if_hot"
+
+
+def get_generation_key(label):
+    return f"{label}||GENERATION"
+
+
+def get_hits_key(key):
+    return f"{key}||HITS"
+
+
+def count_hit(key: str, timeout: int):
+    hits_key = get_hits_key(key)
+    try:
+        cache.incr(hits_key)
+    except ValueError:
+        cache.add(hits_key, 1, timeout)
 
 
 class LocalSettingsBundle(NamedTuple):
@@ -19,13 +51,21 @@ class LocalSettingsBundle(NamedTuple):
     tick: int
     is_concurrent: bool
     delay_logging: bool
+    buffer_logging: bool
     relevance_invalidation: bool
     relevance_expires: int
     delay_invalidation: bool
     delay_countdown: int
+    stale_while_revalidate: bool
+
+
+LOCAL_SETTINGS_FIELDS = frozenset(LocalSettingsBundle._fields)
 
 
 def get_local_settings(attributes, worker: "CacheWorker"):
+    # Worker defaults are compiled once, attributes are parsed only with overrides
+    if LOCAL_SETTINGS_FIELDS.isdisjoint(attributes):
+        return worker.local_settings
     return LocalSettingsBundle(**{
         field: attributes.pop(field, getattr(worker, field, None))
         for field in LocalSettingsBundle._fields
@@ -48,35 +88,120 @@ class CacheWorker:
         relevance_expires: int = default.DEFAULT_RELEVANCE_EXPIRES,
         delay_countdown: int = default.DEFAULT_DELAY_COUNTDOWN,
         delay_logging: bool = default.DEFAULT_DELAY_LOGGING,
+        buffer_logging: bool = default.DEFAULT_BUFFER_LOGGING,
         is_concurrent: bool = default.IS_CONCURRENT,
+        lock_expires: int = default.DEFAULT_LOCK_EXPIRES,
+        stale_while_revalidate: bool = default.DEFAULT_STALE_WHILE_REVALIDATE,
+        local_cache: bool = default.DEFAULT_LOCAL_CACHE,
+        local_cache_size: int = default.DEFAULT_LOCAL_CACHE_SIZE,
+        local_cache_bytes: int = default.DEFAULT_LOCAL_CACHE_BYTES,
+        many_structure_getter: Optional[Callable[[List[Dict]], List[Any]]] = None,
+        invalidation_strategy: str = default.DEFAULT_INVALIDATION_STRATEGY,
+        hot_hits: int = default.DEFAULT_HOT_HITS,
+        generations: bool = default.DEFAULT_GENERATIONS,
+        codec: Union[str, DictCodec] = default.DEFAULT_CODEC,
+        materialization: str = default.DEFAULT_MATERIALIZATION,
+        early_refresh: bool = default.DEFAULT_EARLY_REFRESH,
+        early_refresh_beta: float = default.DEFAULT_EARLY_REFRESH_BETA,
+        expires_jitter: float = default.DEFAULT_EXPIRES_JITTER,
+        apply_delta: Union[str, Delta, None] = None,
         is_register: bool = True
     ):
         # General
         self.label = label
-        self.key_gen = key_gen
+        self.key_gen = get_keygen(key_gen)
         self.structure_getter = structure_getter
+        self.many_structure_getter = many_structure_getter
         self.expires = expires
+        self.expires_jitter = expires_jitter
+        self.generations = generations
         self.cached_entity = cached_entity
+        self.codec = get_codec(codec)
+        self.materialization = materialization
+        # Patch cached value by changed instance instead of rebuilding
+        self.apply_delta = get_delta(apply_delta)
         # Ticks configure
         self.tick_amount = tick_amount
         self.tick = tick
         # Logging
         self.delay_logging = delay_logging
+        self.buffer_logging = buffer_logging
         # Invalidation by expires time
         self.relevance_invalidation = relevance_invalidation
         self.relevance_expires = relevance_expires
         self.delay_invalidation = delay_invalidation
         self.delay_countdown = delay_countdown
+        self.invalidation_strategy = invalidation_strategy
+        self.hot_hits = hot_hits
+        self.stale_while_revalidate = stale_while_revalidate
+        self.early_refresh = early_refresh
+        self.early_refresh_beta = early_refresh_beta
         self.is_concurrent = is_concurrent
+        self.lock_expires = lock_expires
+        # In-process cache tier
+        self.local_cache = (
+            LocalCache(label, local_cache_size, local_cache_bytes)
+            if local_cache else None
+        )
         if is_register:
             self.__register()
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            # Compile settings again after any change
+            super().__setattr__("_local_settings", None)
+
+    def __compile(self):
+        self._local_settings = LocalSettingsBundle(**{
+            field: getattr(self, field, None)
+            for field in LocalSettingsBundle._fields
+        })
+        # Hit can return stored value as is, without building entity
+        self._is_plain_value = (
+            self.local_cache is None
+            and not self.cached_entity
+            and self.invalidation_strategy != REBUILD_IF_HOT
+            and self.materialization != IDS
+            and not self.early_refresh
+        )
+
+    @property
+    def local_settings(self) -> LocalSettingsBundle:
+        if self._local_settings is None:
+            self.__compile()
+        return self._local_settings
+
+    @property
+    def is_plain_value(self) -> bool:
+        if self._local_settings is None:
+            self.__compile()
+        return self._is_plain_value
+
     def __register(self):
         from .registration import workers_collection
         workers_collection.register_worker(self.label, self)
 
+    def get_generation(self) -> int:
+        generation_key = get_generation_key(self.label)
+        generation = cache.get(generation_key)
+        if generation is None:
+            # Start from current time, so lost counter will not return old values
+            cache.add(generation_key, int(time.time() * 1000), None)
+            generation = cache.get(generation_key)
+        return generation
+
+    def get_prefix(self) -> str:
+        if self.generations:
+            return f"{self.label}#{self.get_generation()}"
+        return self.label
+
     def get_key(self, *args, **kwargs):
-        return f"{self.label}@{self.key_gen(*args, **kwargs)}"
+        return f"{self.get_prefix()}@{self.key_gen(*args, **kwargs)}"
+
+    def get_keys(self, arguments: Iterable[Dict]) -> List[str]:
+        prefix = self.get_prefix()
+        return [f"{prefix}@{self.key_gen(**kwargs)}" for kwargs in arguments]
 
     def save(self, local_settings: LocalSettingsBundle = None, *args, **kwargs):
         if not local_settings:
@@ -84,62 +209,481 @@ class CacheWorker:
                 "local_settings", get_local_settings(kwargs, self)
             )
         key = self.get_key(*args, **kwargs)
-        # Save precache
-        cache.set(get_precache_key(key), True, 10)
-        return self.__save(local_settings=local_settings, key_=key, *args, **kwargs)
+        # Hold precache lock while building, so concurrent getters will wait
+        with SingleFlightLock(key, self.lock_expires):
+            return self.__save(local_settings=local_settings, key_=key, *args, **kwargs)
 
-    def __save(self, local_settings: LocalSettingsBundle, key_: str, *args, **kwargs):
-        now = datetime.now()
-        entity = CachedEntity(
-            value=self.structure_getter(*args, **kwargs),
-            key=key_,
+    def save_many(self, arguments: Iterable[Dict], **kwargs) -> List[Any]:
+        local_settings: LocalSettingsBundle = get_local_settings(kwargs, self)
+        arguments = list(arguments)
+        keys = self.get_keys(arguments)
+        saved = self.__save_many(local_settings, dict(zip(keys, arguments)), is_forced=True)
+        return [saved[key] for key in keys]
+
+    def __result(self, entity: CachedEntity):
+        if self.materialization == IDS:
+            entity = entity._replace(value=dematerialize(entity.value))
+        return entity if self.cached_entity else entity.value
+
+    def __result_many(self, entities: Dict[str, CachedEntity]) -> Dict[str, Any]:
+        if self.materialization == IDS:
+            # Instances of all values are fetched by one query per model
+            values = dematerialize_many([entity.value for entity in entities.values()])
+            entities = {
+                key: entity._replace(value=value) for (key, entity), value in zip(entities.items(), values)
+            }
+        return {key: entity if self.cached_entity else entity.value for key, entity in entities.items()}
+
+    def __jitter(self, expires: int) -> int:
+        # Spread expiration of values written together
+        if not self.expires_jitter or not expires:
+            return expires
+        return int(expires * (1 - random.uniform(0, self.expires_jitter)))
+
+    def __build_entity(
+        self, local_settings: LocalSettingsBundle, key: str, value: Any, now: datetime, build_time: float = 0.0
+    ):
+        started = time.perf_counter()
+        value = materialize(value, self.materialization)
+        expires = self.__jitter(local_settings.expires)
+        return CachedEntity(
+            value=value,
+            key=key,
             label=self.label,
-            expires=local_settings.expires,
+            expires=expires,
             is_relevance_invalidation=local_settings.relevance_invalidation,
             created_at=now,
-            available_to=now + timedelta(seconds=local_settings.expires),
-            relevance_to=now + timedelta(seconds=local_settings.relevance_expires)
+            available_to=now + timedelta(seconds=expires),
+            relevance_to=now + timedelta(seconds=local_settings.relevance_expires),
+            # Only early refresh needs build time
+            build_time=build_time + time.perf_counter() - started if self.early_refresh else 0.0
+        )
+
+    def __build(self, local_settings: LocalSettingsBundle, key_: str, *args, **kwargs):
+        started = time.perf_counter()
+        with collect_tags() as tags:
+            value = self.structure_getter(*args, **kwargs)
+        entity = self.__build_entity(
+            local_settings, key_, value, datetime.now(), time.perf_counter() - started
         )
+        return entity, tags
+
+    def __save(self, local_settings: LocalSettingsBundle, key_: str, *args, **kwargs):
+        entity, tags = self.__build(local_settings, key_, *args, **kwargs)
+        # Positional arguments follow, so settings are passed positionally too
         cache_value(
-            cache_entity=entity,
-            is_delay=local_settings.delay_logging,
+            entity, local_settings.delay_logging, local_settings.buffer_logging, self.codec.encode,
             *args, **kwargs
         )
-        return entity if self.cached_entity else entity.value
+        # Tags are registered after writing, so concurrent invalidation can delete value
+        is_registered = not tags or register_tags(self.label, key_, tags, entity.expires)
+        if self.local_cache and is_registered:
+            self.local_cache.set(key_, entity)
+        return self.__result(entity)
+
+    def __save_many(
+        self, local_settings: LocalSettingsBundle, arguments: Dict[str, Dict], is_forced: bool = False
+    ) -> Dict[str, Any]:
+        if not arguments:
+            return {}
+        # Build only keys claimed by current process, others are built concurrently
+        locks = {key: SingleFlightLock(key, self.lock_expires) for key in arguments}
+        claimed = {key: kwargs for key, kwargs in arguments.items() if locks[key].acquire()}
+        entities, keys_tags = [], {}
+        try:
+            if claimed:
+                entities, keys_tags = self.__build_many(local_settings, claimed)
+                cache_values(
+                    entities,
+                    is_delay=local_settings.delay_logging,
+                    is_buffer=local_settings.buffer_logging,
+                    encode=self.codec.encode
+                )
+        finally:
+            release_many(list(locks.values()))
+        for entity, _ in entities:
+            tags = keys_tags[entity.key]
+            is_registered = not tags or register_tags(self.label, entity.key, tags, entity.expires)
+            if self.local_cache and is_registered:
+                self.local_cache.set(entity.key, entity)
+        result = self.__result_many({entity.key: entity for entity, _ in entities})
+        for key, kwargs in arguments.items():
+            if key in claimed:
+                continue
+            if not is_forced:
+                # Wait for value of lock owner
+                result[key] = self.__get_or_save(key, local_settings, **kwargs)
+                continue
+            # Value of lock owner could be built before changes, so it's built again after release
+            lock = locks[key]
+            lock.acquire_waiting(self.lock_expires, local_settings.tick)
+            try:
+                result[key] = self.__save(local_settings, key, **kwargs)
+            finally:
+                lock.release()
+        return result
+
+    def __build_many(self, local_settings: LocalSettingsBundle, arguments: Dict[str, Dict]):
+        started = time.perf_counter()
+        if self.many_structure_getter:
+            # Tags of batch are applied to all its keys
+            with collect_tags() as tags:
+                values = self.many_structure_getter(list(arguments.values()))
+            keys_tags = dict.fromkeys(arguments, tags)
+        else:
+            values, keys_tags = [], {}
+            for key, kwargs in arguments.items():
+                with collect_tags() as keys_tags[key]:
+                    values.append(self.structure_getter(**kwargs))
+        build_time = (time.perf_counter() - started) / len(arguments)
+        now = datetime.now()
+        entities = [
+            (self.__build_entity(local_settings, key, value, now, build_time), kwargs)
+            for (key, kwargs), value in zip(arguments.items(), values)
+        ]
+        return entities, keys_tags
 
     def __get(self, key: str, local_settings):
-        value_data = cache.get(key)
-        if not value_data:
-            return
-        entity = CachedEntity(**value_data)
+        if self.is_plain_value and not local_settings.relevance_invalidation:
+            return self.codec.decode_value(cache.get(key))
+        entity = self.local_cache and self.local_cache.get(key)
+        if not entity:
+            entity = self.codec.decode(cache.get(key))
+            if not entity:
+                return
+            if self.local_cache:
+                self.local_cache.set(key, entity)
+        return self.__load(key, entity, local_settings)
+
+    def __load(self, key: str, entity: CachedEntity, local_settings: LocalSettingsBundle):
+        entity = self.__check(key, entity, local_settings)
+        return entity and self.__result(entity)
+
+    def __load_many(self, entities: Dict[str, CachedEntity], local_settings: LocalSettingsBundle) -> Dict[str, Any]:
+        checked = {key: self.__check(key, entity, local_settings) for key, entity in entities.items()}
+        return self.__result_many({key: entity for key, entity in checked.items() if entity})
+
+    def __check(self, key: str, entity: CachedEntity, local_settings: LocalSettingsBundle) -> Optional[CachedEntity]:
         # Check by relevance and do invalidation if need it
         if local_settings.relevance_invalidation and entity.relevance_to <= datetime.now():
-            from ..tasks import lazy_invalidation_task
-            if not local_settings.delay_invalidation:
-                return lazy_invalidation_task(key)
-            # Will run invalidation in delay, and return old cached value
-            lazy_invalidation_task.delay(key)
+            if not (local_settings.delay_invalidation or local_settings.stale_while_revalidate):
+                # Will be rebuilt as missed value
+                return
+            # Will run invalidation in background, and return old cached value
+            revalidate(key, self.lock_expires, is_delay=local_settings.delay_invalidation)
+            if observers:
+                observe(self.label, STALE)
+        elif self.early_refresh and self.__is_early_refresh(entity):
+            # Refresh in background before expiration, value is still valid
+            revalidate(key, self.lock_expires, is_delay=local_settings.delay_invalidation)
+            if observers:
+                observe(self.label, EARLY_REFRESH)
+        if self.invalidation_strategy == REBUILD_IF_HOT:
+            count_hit(key, entity.expires)
+        return entity
 
-        return entity if self.cached_entity else entity.value
+    def __is_early_refresh(self, entity: CachedEntity) -> bool:
+        # XFetch: probability grows to expiration, longer building values are refreshed earlier
+        if not entity.build_time:
+            return False
+        gap = -entity.build_time * self.early_refresh_beta * math.log(1 - random.random())
+        return datetime.now() + timedelta(seconds=gap) >= entity.available_to
 
-    def cache_ticks_getter(self, key: str, local_settings: LocalSettingsBundle) -> Generator:
+    def cache_ticks_getter(
+        self, key: str, local_settings: LocalSettingsBundle, lock: SingleFlightLock
+    ) -> Generator:
         # Try to get cache
         yield self.__get(key, local_settings)
-        # Get precached marker
-        if local_settings.is_concurrent:
-            is_precached = cache.get(get_precache_key(key))
-            if not is_precached:
+        yield from self.__wait_ticks(key, local_settings, lock)
+
+    def __wait_ticks(
+        self, key: str, local_settings: LocalSettingsBundle, lock: SingleFlightLock
+    ) -> Generator:
+        if not local_settings.is_concurrent:
+            return
+        # Wait while the lock owner builds value, stop as soon as lock claimed by current process.
+        # Lock can't be held longer than `lock_expires`.
+        deadline = time.monotonic() + max(local_settings.tick * local_settings.tick_amount, self.lock_expires)
+        interval = min(local_settings.tick, default.MIN_TICK_SIZE)
+        while not lock.acquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 return
-            for _ in range(local_settings.tick_amount):
-                time.sleep(local_settings.tick)
-                yield self.__get(key, local_settings)
+            lock.wait(min(interval, remaining))
+            interval = min(interval * 2, local_settings.tick)
+            yield self.__get(key, local_settings)
+
+    def __get_or_save(self, key: str, local_settings: LocalSettingsBundle, *args, **kwargs):
+        # Hit does not create lock and generator
+        cached_data = self.__get(key, local_settings)
+        if cached_data:
+            if observers:
+                observe(self.label, HIT)
+            return cached_data
+        lock = SingleFlightLock(key, self.lock_expires)
+        started = time.perf_counter()
+        is_waited = False
+        for cached_data in self.__wait_ticks(key, local_settings, lock):
+            is_waited = True
+            if cached_data:
+                break
+        if is_waited and observers:
+            observe(self.label, WAIT, time.perf_counter() - started)
+        try:
+            if not cached_data and lock.is_owner:
+                # Owner could save value right before lock was claimed
+                cached_data = self.__get(key, local_settings)
+            if cached_data:
+                return cached_data
+            if observers:
+                return timed(self.label, MISS, self.__save, local_settings, key, *args, **kwargs)
+            return self.__save(local_settings, key, *args, **kwargs)
+        finally:
+            lock.release()
 
     def get(self, *args, **kwargs):
         local_settings: LocalSettingsBundle = get_local_settings(kwargs, self)
-        for cached_data in self.cache_ticks_getter(self.get_key(*args, **kwargs), local_settings):
+        key = self.get_key(*args, **kwargs)
+        return self.__get_or_save(key, local_settings, *args, **kwargs)
+
+    def get_many(self, arguments: Iterable[Dict], **kwargs) -> List[Any]:
+        local_settings: LocalSettingsBundle = get_local_settings(kwargs, self)
+        arguments = list(arguments)
+        keys = self.get_keys(arguments)
+        result = {}
+        if self.local_cache:
+            entities = {key: self.local_cache.get(key) for key in keys}
+            result.update(self.__load_many({key: entity for key, entity in entities.items() if entity}, local_settings))
+        missed = {key: item for key, item in zip(keys, arguments) if not result.get(key)}
+        # Get all not local values in one request
+        entities = {}
+        for key, value_data in cache.get_many(list(missed)).items():
+            entity = self.codec.decode(value_data)
+            if not entity:
+                continue
+            if self.local_cache:
+                self.local_cache.set(key, entity)
+            entities[key] = entity
+        result.update(self.__load_many(entities, local_settings))
+        for key in entities:
+            if result.get(key):
+                del missed[key]
+        if observers:
+            observe(self.label, HIT, count=sum(1 for value in result.values() if value))
+        # Values which are building by other processes are waited while saving
+        if missed and observers:
+            started = time.perf_counter()
+            result.update(self.__save_many(local_settings, missed))
+            observe(self.label, MISS, time.perf_counter() - started, count=len(missed))
+        else:
+            result.update(self.__save_many(local_settings, missed))
+        return [result[key] for key in keys]
+
+    async def aget_generation(self) -> int:
+        generation_key = get_generation_key(self.label)
+        generation = await acache("get", generation_key)
+        if generation is None:
+            await acache("add", generation_key, int(time.time() * 1000), None)
+            generation = await acache("get", generation_key)
+        return generation
+
+    async def aget_prefix(self) -> str:
+        if self.generations:
+            return f"{self.label}#{await self.aget_generation()}"
+        return self.label
+
+    async def aget_key(self, *args, **kwargs):
+        return f"{await self.aget_prefix()}@{self.key_gen(*args, **kwargs)}"
+
+    async def aget_keys(self, arguments: Iterable[Dict]) -> List[str]:
+        prefix = await self.aget_prefix()
+        return [f"{prefix}@{self.key_gen(**kwargs)}" for kwargs in arguments]
+
+    async def __asave(self, local_settings: LocalSettingsBundle, key_: str, *args, **kwargs):
+        # Database work (getter, materialization, logging) runs in sync threads
+        if asyncio.iscoroutinefunction(self.structure_getter):
+            started = time.perf_counter()
+            with collect_tags() as tags:
+                value = await self.structure_getter(*args, **kwargs)
+            entity = await sync_to_async(self.__build_entity)(
+                local_settings, key_, value, datetime.now(), time.perf_counter() - started
+            )
+        else:
+            entity, tags = await sync_to_async(self.__build)(local_settings, key_, *args, **kwargs)
+        await acache("set", key_, await self.codec.aencode(entity), entity.expires)
+        await sync_to_async(log_entity)(
+            entity, local_settings.delay_logging, local_settings.buffer_logging, *args, **kwargs
+        )
+        is_registered = not tags or await sync_to_async(register_tags)(self.label, key_, tags, entity.expires)
+        if self.local_cache and is_registered:
+            self.local_cache.set(key_, entity)
+        if self.materialization == IDS:
+            return await sync_to_async(self.__result)(entity)
+        return self.__result(entity)
+
+    async def __asave_claimed(self, local_settings: LocalSettingsBundle, key_: str, **kwargs):
+        lock = SingleFlightLock(key_, self.lock_expires)
+        if not await lock.aacquire():
+            # Wait for value of lock owner
+            return await self.__aget_or_save(key_, local_settings, **kwargs)
+        try:
+            return await self.__asave(local_settings, key_, **kwargs)
+        finally:
+            await lock.arelease()
+
+    async def __aget(self, key: str, local_settings: LocalSettingsBundle):
+        if self.is_plain_value and not local_settings.relevance_invalidation:
+            return await self.codec.adecode_value(await acache("get", key))
+        entity = self.local_cache and await self.local_cache.aget(key)
+        if not entity:
+            entity = await self.codec.adecode(await acache("get", key))
+            if not entity:
+                return
+            if self.local_cache:
+                self.local_cache.set(key, entity)
+        return await self.__aload(key, entity, local_settings)
+
+    async def __aload(self, key: str, entity: CachedEntity, local_settings: LocalSettingsBundle):
+        # Plain hit is returned without leaving event loop
+        if not (
+            (local_settings.relevance_invalidation and entity.relevance_to <= datetime.now())
+            or self.invalidation_strategy == REBUILD_IF_HOT
+            or self.materialization == IDS
+            or self.early_refresh
+        ):
+            return self.__result(entity)
+        return await sync_to_async(self.__load)(key, entity, local_settings)
+
+    async def __aload_many(self, entities: Dict[str, CachedEntity], local_settings: LocalSettingsBundle):
+        if entities and self.materialization == IDS:
+            return await sync_to_async(self.__load_many)(entities, local_settings)
+        return {key: await self.__aload(key, entity, local_settings) for key, entity in entities.items()}
+
+    async def acache_ticks_getter(
+        self, key: str, local_settings: LocalSettingsBundle, lock: SingleFlightLock
+    ) -> AsyncGenerator:
+        yield await self.__aget(key, local_settings)
+        async for cached_data in self.__await_ticks(key, local_settings, lock):
+            yield cached_data
+
+    async def __await_ticks(
+        self, key: str, local_settings: LocalSettingsBundle, lock: SingleFlightLock
+    ) -> AsyncGenerator:
+        if not local_settings.is_concurrent:
+            return
+        deadline = time.monotonic() + max(local_settings.tick * local_settings.tick_amount, self.lock_expires)
+        interval = min(local_settings.tick, default.MIN_TICK_SIZE)
+        while not await lock.aacquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, local_settings.tick)
+            yield await self.__aget(key, local_settings)
+
+    async def __aget_or_save(self, key: str, local_settings: LocalSettingsBundle, *args, **kwargs):
+        cached_data = await self.__aget(key, local_settings)
+        if cached_data:
+            if observers:
+                observe(self.label, HIT)
+            return cached_data
+        lock = SingleFlightLock(key, self.lock_expires)
+        started = time.perf_counter()
+        is_waited = False
+        async for cached_data in self.__await_ticks(key, local_settings, lock):
+            is_waited = True
+            if cached_data:
+                break
+        if is_waited and observers:
+            observe(self.label, WAIT, time.perf_counter() - started)
+        try:
+            if not cached_data and lock.is_owner:
+                cached_data = await self.__aget(key, local_settings)
             if cached_data:
                 return cached_data
-        return self.save(local_settings=local_settings, *args, **kwargs)
+            started = time.perf_counter()
+            cached_data = await self.__asave(local_settings, key, *args, **kwargs)
+            if observers:
+                observe(self.label, MISS, time.perf_counter() - started)
+            return cached_data
+        finally:
+            await lock.arelease()
+
+    async def aget(self, *args, **kwargs):
+        local_settings: LocalSettingsBundle = get_local_settings(kwargs, self)
+        key = await self.aget_key(*args, **kwargs)
+        return await self.__aget_or_save(key, local_settings, *args, **kwargs)
+
+    async def asave(self, local_settings: LocalSettingsBundle = None, *args, **kwargs):
+        if not local_settings:
+            local_settings: LocalSettingsBundle = kwargs.pop(
+                "local_settings", get_local_settings(kwargs, self)
+            )
+        key = await self.aget_key(*args, **kwargs)
+        lock = SingleFlightLock(key, self.lock_expires)
+        await lock.aacquire()
+        try:
+            return await self.__asave(local_settings, key, *args, **kwargs)
+        finally:
+            await lock.arelease()
+
+    async def ainvalidate(self, outdated: Dict, newcomers: Dict = None, **kwargs):
+        from .invalidation import ainvalidate
+        await ainvalidate(self, outdated, newcomers, **kwargs)
+
+    async def ainvalidate_all(self, **kwargs):
+        from .invalidation import ainvalidate_all
+        await ainvalidate_all(self, **kwargs)
+
+    async def aget_many(self, arguments: Iterable[Dict], **kwargs) -> List[Any]:
+        local_settings: LocalSettingsBundle = get_local_settings(kwargs, self)
+        arguments = list(arguments)
+        keys = await self.aget_keys(arguments)
+        result = {}
+        if self.local_cache:
+            entities = {key: await self.local_cache.aget(key) for key in keys}
+            result.update(await self.__aload_many(
+                {key: entity for key, entity in entities.items() if entity}, local_settings
+            ))
+        missed = {key: item for key, item in zip(keys, arguments) if not result.get(key)}
+        entities = {}
+        for key, value_data in (await acache("get_many", list(missed))).items():
+            entity = await self.codec.adecode(value_data)
+            if not entity:
+                continue
+            if self.local_cache:
+                self.local_cache.set(key, entity)
+            entities[key] = entity
+        result.update(await self.__aload_many(entities, local_settings))
+        for key in entities:
+            if result.get(key):
+                del missed[key]
+        if observers:
+            observe(self.label, HIT, count=sum(1 for value in result.values() if value))
+        started = time.perf_counter()
+        if missed and (self.many_structure_getter or not asyncio.iscoroutinefunction(self.structure_getter)):
+            result.update(await sync_to_async(self.__save_many)(local_settings, missed))
+        elif missed:
+            values = await asyncio.gather(*(
+                self.__asave_claimed(local_settings, key, **item) for key, item in missed.items()
+            ))
+            result.update(zip(missed, values))
+        if missed and observers:
+            observe(self.label, MISS, time.perf_counter() - started, count=len(missed))
+        return [result[key] for key in keys]
+
+    def clear_local(self):
+        # Evict in-process values in all processes
+        if self.local_cache:
+            self.local_cache.clear()
 
     def clear_all(self):
-        cache.delete_pattern(f"{self.label}*")
+        if self.generations:
+            # Values with old generation are not available and will be expired
+            try:
+                cache.incr(get_generation_key(self.label))
+            except ValueError:
+                self.get_generation()
+        else:
+            cache.delete_pattern(f"{self.label}*")
+        self.clear_local()
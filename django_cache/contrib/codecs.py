@@ -0,0 +1,245 @@
+from datetime import datetime
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional, Union
+from uuid import uuid4
+import lzma
+import pickle
+import threading
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from .aio import acache
+from .save import CachedEntity
+from . import settings as default
+
+
+CHUNKS_KEY = "django_cache||CHUNK"
+TUPLE_ENVELOPE = 1
+CHUNKED_ENVELOPE = 2
+# First byte of compressed payload
+RAW_MARKER = b"r"
+ZLIB_MARKER = b"z"
+LZMA_MARKER = b"x"
+
+
+class DictCodec:
+    # Original format, dict with all entity fields
+
+    def encode(self, entity: CachedEntity) -> Any:
+        return entity.to_cache()
+
+    def decode(self, data: Any) -> Optional[CachedEntity]:
+        return decode(data)
+
+    def decode_value(self, data: Any) -> Any:
+        return decode_value(data)
+
+    # Async variants don't block event loop by reading and writing of parts
+    async def aencode(self, entity: CachedEntity) -> Any:
+        return self.encode(entity)
+
+    async def adecode(self, data: Any) -> Optional[CachedEntity]:
+        if is_manifest(data):
+            data = await aload_chunks(data)
+        return self.decode(data)
+
+    async def adecode_value(self, data: Any) -> Any:
+        if is_manifest(data):
+            data = await aload_chunks(data)
+        return self.decode_value(data)
+
+
+class TupleCodec(DictCodec):
+    # Compact envelope with epoch timestamps
+
+    def encode(self, entity: CachedEntity) -> Any:
+        data = (
+            TUPLE_ENVELOPE,
+            entity.label,
+            entity.key,
+            entity.expires,
+            entity.is_relevance_invalidation,
+            entity.created_at.timestamp(),
+            entity.relevance_to.timestamp(),
+            entity.available_to.timestamp(),
+        )
+        if entity.build_time:
+            # Build time is stored for early refresh only
+            return (*data, entity.build_time, entity.value)
+        return (*data, entity.value)
+
+
+class CompressedCodec(TupleCodec):
+    # Pickled tuple envelope, compressed when bigger than threshold
+
+    def __init__(self, marker: bytes, threshold: int = None):
+        self.marker = marker
+        self.threshold = default.COMPRESS_THRESHOLD if threshold is None else threshold
+
+    def encode(self, entity: CachedEntity) -> Any:
+        payload = pickle.dumps(super().encode(entity), pickle.HIGHEST_PROTOCOL)
+        if len(payload) < self.threshold:
+            return RAW_MARKER + payload
+        return self.marker + COMPRESSORS[self.marker][0](payload)
+
+
+class ChunkedCodec(CompressedCodec):
+    # Payload bigger than chunk size is written in sub-keys by version,
+    # manifest under value key is switched by one `set`, so parts of
+    # different versions are never mixed.
+    # Encoding writes parts, so it's called only by value writing, `dumps` gives payload without them.
+
+    def __init__(self, marker: bytes, threshold: int = None, chunk_size: int = None):
+        super().__init__(marker, threshold)
+        self.chunk_size = default.CHUNK_SIZE if chunk_size is None else chunk_size
+
+    def dumps(self, entity: CachedEntity) -> bytes:
+        return super().encode(entity)
+
+    def encode(self, entity: CachedEntity) -> Any:
+        payload = self.dumps(entity)
+        if len(payload) <= self.chunk_size:
+            return payload
+        # Only big value could be stored as manifest, its parts are deleted after the gap
+        expire_chunks(cache.get(entity.key))
+        version = uuid4().hex[:16]
+        chunks = {
+            get_chunk_key(entity.key, version, number): payload[start:start + self.chunk_size]
+            for number, start in enumerate(range(0, len(payload), self.chunk_size))
+        }
+        # Parts must outlive manifest
+        cache.set_many(chunks, entity.expires and entity.expires + default.CHUNK_EXPIRES_GAP)
+        return CHUNKED_ENVELOPE, entity.key, version, len(chunks), len(payload)
+
+    async def aencode(self, entity: CachedEntity) -> Any:
+        return await sync_to_async(self.encode, thread_sensitive=False)(entity)
+
+
+def get_chunk_key(key: str, version: str, number: int) -> str:
+    # Value key can be close to memcached limit, so parts are stored by its digest
+    return f"{CHUNKS_KEY}||{blake2b(key.encode(), digest_size=16).hexdigest()}||{version}||{number}"
+
+
+def is_manifest(data: Any) -> bool:
+    return isinstance(data, tuple) and data[0] == CHUNKED_ENVELOPE
+
+
+def get_chunk_keys(manifest: tuple) -> List[str]:
+    _, key, version, count, _ = manifest
+    return [get_chunk_key(key, version, number) for number in range(count)]
+
+
+def join_chunks(manifest: tuple, keys: List[str], chunks: Dict[str, bytes]) -> Optional[bytes]:
+    # Value is missed if any part is expired or evicted
+    if len(chunks) < len(keys):
+        return None
+    payload = b"".join(chunks[chunk_key] for chunk_key in keys)
+    return payload if len(payload) == manifest[4] else None
+
+
+def load_chunks(manifest: tuple) -> Optional[bytes]:
+    keys = get_chunk_keys(manifest)
+    return join_chunks(manifest, keys, cache.get_many(keys))
+
+
+async def aload_chunks(manifest: tuple) -> Optional[bytes]:
+    keys = get_chunk_keys(manifest)
+    return join_chunks(manifest, keys, await acache("get_many", keys))
+
+
+def expire_chunks(manifest: Any) -> Optional[threading.Timer]:
+    # Readers of replaced manifest get its parts during the gap
+    if not is_manifest(manifest):
+        return None
+    timer = threading.Timer(default.CHUNK_EXPIRES_GAP, cache.delete_many, [get_chunk_keys(manifest)])
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+COMPRESSORS = {
+    ZLIB_MARKER: (zlib.compress, zlib.decompress),
+    LZMA_MARKER: (lzma.compress, lzma.decompress),
+}
+
+
+def decode_tuple(data: tuple) -> CachedEntity:
+    if len(data) == 9:
+        # Envelope without build time
+        data = (*data[:8], 0.0, data[8])
+    (
+        _, label, key, expires, is_relevance_invalidation,
+        created_at, relevance_to, available_to, build_time, value
+    ) = data
+    return CachedEntity(
+        label=label,
+        key=key,
+        expires=expires,
+        is_relevance_invalidation=is_relevance_invalidation,
+        created_at=datetime.fromtimestamp(created_at),
+        relevance_to=datetime.fromtimestamp(relevance_to),
+        available_to=datetime.fromtimestamp(available_to),
+        build_time=build_time,
+        value=value,
+    )
+
+
+def load_payload(data: bytes) -> Any:
+    marker, payload = data[:1], data[1:]
+    if marker != RAW_MARKER:
+        payload = COMPRESSORS[marker][1](payload)
+    return pickle.loads(payload)
+
+
+def decode(data: Any) -> Optional[CachedEntity]:
+    # Every codec reads all formats, so worker codec can be changed on the fly
+    if not data:
+        return None
+    if isinstance(data, dict):
+        return CachedEntity(**data)
+    if is_manifest(data):
+        data = load_chunks(data)
+        if data is None:
+            return None
+    if isinstance(data, bytes):
+        data = load_payload(data)
+    if isinstance(data, tuple) and data[0] == TUPLE_ENVELOPE:
+        return decode_tuple(data)
+    return None
+
+
+def decode_value(data: Any) -> Any:
+    # Only value, without building entity
+    if not data:
+        return None
+    if isinstance(data, dict):
+        return data["value"]
+    if is_manifest(data):
+        data = load_chunks(data)
+        if data is None:
+            return None
+    if isinstance(data, bytes):
+        data = load_payload(data)
+    if isinstance(data, tuple) and data[0] == TUPLE_ENVELOPE:
+        return data[-1]
+    return None
+
+
+CODECS: Dict[str, DictCodec] = {
+    "dict": DictCodec(),
+    "tuple": TupleCodec(),
+    "zlib": CompressedCodec(ZLIB_MARKER),
+    "lzma": CompressedCodec(LZMA_MARKER),
+    "chunked": ChunkedCodec(ZLIB_MARKER),
+}
+
+
+def get_codec(codec: Union[str, DictCodec, None]) -> DictCodec:
+    if codec is None:
+        return CODECS["dict"]
+    if isinstance(codec, str):
+        return CODECS[codec] if codec in CODECS else import_string(codec)()
+    return codec
@@ -0,0 +1,123 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, QuerySet
+from django.utils.module_loading import import_string
+
+from .lock import SingleFlightLock
+from .materialization import INSTANCES
+
+
+# Operations
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+
+# Delta receives cached value, changed instance, operation and kwargs of value.
+# Returns new value, must return value as is for not related instance.
+Delta = Callable[[Any, Any, str, Dict], Any]
+
+
+class DeltaNotApplicable(Exception):
+    # Value will be rebuilt
+    pass
+
+
+def detach_instance(instance):
+    # Copy with field values only, related objects and hooks state are not cached
+    detached = instance.__class__(**{
+        field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields
+    })
+    detached._state.adding = False
+    detached._state.db = instance._state.db
+    return detached
+
+
+def is_matched(instance, kwargs: Dict) -> bool:
+    for name, value in kwargs.items():
+        try:
+            field = instance._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Lookups, `pk` alias and not field arguments can't be checked
+            raise DeltaNotApplicable(name)
+        if not field.concrete:
+            # Reverse and many to many relations
+            raise DeltaNotApplicable(name)
+        if isinstance(value, Model):
+            value = value.pk
+        # Foreign keys are compared by column value, without loading related object
+        if getattr(instance, field.attname) != value:
+            return False
+    return True
+
+
+def filtered_instances_delta(value: Any, instance, operation: str, kwargs: Dict) -> Any:
+    # Value is list or queryset of instances filtered by equality to kwargs.
+    # Instances are appended, so ordered querysets are rebuilt when instance is added or changed.
+    if not isinstance(value, (list, QuerySet)):
+        raise DeltaNotApplicable(type(value))
+    items = list(value)
+    index = next((i for i, item in enumerate(items) if item.pk == instance.pk), None)
+    is_contained = operation != DELETE and is_matched(instance, kwargs)
+    if index is None and not is_contained:
+        return value
+    if is_contained and isinstance(value, QuerySet) and value.ordered:
+        raise DeltaNotApplicable("ordered")
+    if index is None:
+        items.append(instance)
+    elif is_contained:
+        items[index] = instance
+    else:
+        del items[index]
+    return replace_items(value, items)
+
+
+def replace_items(value: Any, items: list) -> Any:
+    # Queryset is kept evaluated by patched items, so it's pickled without queries
+    if not isinstance(value, QuerySet):
+        return items
+    patched = value.all()
+    patched._result_cache = items
+    patched._prefetch_done = True
+    return patched
+
+
+DELTAS: Dict[str, Delta] = {
+    "instances": filtered_instances_delta,
+}
+
+
+def get_delta(delta: Union[str, Delta, None]) -> Optional[Delta]:
+    if isinstance(delta, str):
+        return DELTAS[delta] if delta in DELTAS else import_string(delta)
+    return delta
+
+
+def patch_value(cache_worker, key: str, kwargs: Dict, changes: Iterable[Tuple[Any, str]]) -> bool:
+    # Lock of key is compare-and-set: value is not built or patched meanwhile.
+    # False means value must be rebuilt.
+    if cache_worker.materialization != INSTANCES:
+        return False
+    lock = SingleFlightLock(key, cache_worker.lock_expires)
+    if not lock.acquire():
+        return False
+    try:
+        entity = cache_worker.codec.decode(cache.get(key))
+        if entity is None:
+            # Will be built on next getting
+            return True
+        timeout = (entity.available_to - datetime.now()).total_seconds()
+        if timeout <= 0:
+            return True
+        value = entity.value
+        try:
+            for instance, operation in changes:
+                value = cache_worker.apply_delta(value, instance, operation, kwargs)
+        except DeltaNotApplicable:
+            return False
+        cache.set(key, cache_worker.codec.encode(entity._replace(value=value)), timeout)
+        return True
+    finally:
+        lock.release()
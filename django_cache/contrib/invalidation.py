@@ -1,14 +1,35 @@
-import itertools
+from collections import defaultdict
+from datetime import timedelta
 from functools import reduce
-from operator import and_, or_
-from typing import Iterable, Dict, Any, List, Iterator
-
+from operator import or_
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
 from django.utils.timezone import datetime
+from django.db import transaction
 from django.db.models import Q
+from django.db.models.functions import Mod
 
 from ..models import CreatedCache
+from .attributes import (
+    get_attributes_groups, build_attributes_filter, build_attributes_filter_groups
+)
+from .save import log_buffer
 from .registration import workers_collection
-from .cache import CacheWorker
+from .cache import CacheWorker, REBUILD, DELETE
+from .rebuild import RebuildResult, rebuild_created_caches, rebuild_batch
+from .tags import Tag, pop_tagged
+from .delta import patch_value
+from .metrics import observers, observe, INVALIDATION
+from . import settings as default
+
+
+logger = logging.getLogger(__name__)
 
 
 def get_attributes_from_object(cache_object: CreatedCache):
@@ -22,108 +43,228 @@ def invalidate_created_caches(
     cache_object: CreatedCache,
     cache_worker: CacheWorker,
     *,
-    is_delete: bool = True
+    is_delete: bool = True,
+    strategy: str = None
 ):
-    args, kwargs = get_attributes_from_object(cache_object)
-    cache_worker.save(*args, **kwargs)
-    if is_delete:
-        cache_object.delete()
-
-
-def get_group_variations_getter(names: Iterable[str]):
-    sorted_names = sorted(names)
-
-    def getter(filters: Dict[str, Any]) -> List[Any]:
-        # Build all available values groups
-        return list(itertools.product(*(filters[name] for name in sorted_names)))
-    return getter, sorted_names
-
-
-def get_differance_attributes(outdated: Dict, newcomers: Dict) -> [Iterable[Iterable[Any]], List[str]]:
-    instance_attributes = {}
-    newcomers_attributes = {}
-    for key, value in newcomers.items():
-        old_value = outdated.get(key)
-        if value != old_value:
-            instance_attributes[key] = [old_value, None]
-            newcomers_attributes[key] = [value, None]
-    get_groups, names = get_group_variations_getter(instance_attributes.keys())
-    return itertools.chain(get_groups(instance_attributes), get_groups(newcomers_attributes)), names
-
-
-def get_instance_attributes(instance: Dict) -> [Iterable[Iterable[Any]], List[str]]:
-    instance_attributes = {key: [value, None] for key, value in instance.items()}
-    get_groups, names = get_group_variations_getter(instance_attributes)
-    return get_groups(instance_attributes), names
-
-
-def build_attributes_filter_groups(outdated: Dict, newcomers: Dict = None) -> Iterator[Q]:
-    attributes, names = (
-        get_differance_attributes(outdated, newcomers)
-        if newcomers else get_instance_attributes(outdated)
+    rebuild_batch(
+        cache_worker,
+        [(cache_object.key, cache_object.attributes)],
+        strategy=strategy,
+        is_delete=is_delete
     )
-    for attributes_group in attributes:
-        yield (reduce(and_, [
-            (
-                Q(**{f"attributes__filterable_kwargs__{attribute}__isnull": True})
-                if value is None
-                else Q(**{f"attributes__filterable_kwargs__{attribute}__contains": value}))
-            for attribute, value in zip(names, attributes_group)
-        ]))
 
 
 def get_created_cache(label, outdated: Dict = None, newcomers: Dict = None):
+    # Buffered logs must be searchable
+    log_buffer.flush()
     if outdated:
-        attributes_filters = reduce(or_, [Q(item) for item in build_attributes_filter_groups(outdated, newcomers)])
-        return CreatedCache.objects.filter(Q(label=label) & Q(attributes_filters))
+        groups = get_attributes_groups(outdated, newcomers)
+        if not groups:
+            # Nothing was changed
+            return CreatedCache.objects.none()
+        attributes_filters = reduce(or_, [build_attributes_filter(label, group) for group in groups])
+        return CreatedCache.objects.filter(Q(label=label) & attributes_filters)
     return CreatedCache.objects.filter(label=label)
 
 
-def invalidate_process(cache_worker: CacheWorker, outdated: Dict = None, newcomers: Dict = None):
-    for cached_object in get_created_cache(cache_worker.label, outdated, newcomers):
-        invalidate_created_caches(cached_object, cache_worker)
+def get_created_cache_many(label, changes: Iterable[Tuple[Dict, Dict]]):
+    # One query for several (outdated, newcomers) pairs
+    log_buffer.flush()
+    groups = []
+    for outdated, newcomers in changes:
+        if not outdated:
+            return CreatedCache.objects.filter(label=label)
+        groups += get_attributes_groups(outdated, newcomers)
+    if not groups:
+        return CreatedCache.objects.none()
+    return CreatedCache.objects.filter(Q(label=label) & build_attributes_filter_groups(label, groups))
 
 
-def invalidate_all_process(cache_worker):
-    for cached_object in CreatedCache.objects.filter(label=cache_worker.label):
-        invalidate_created_caches(cached_object, cache_worker)
+def invalidate_process(cache_worker: CacheWorker, outdated: Dict = None, newcomers: Dict = None):
+    started = time.perf_counter()
+    result = rebuild_created_caches(cache_worker, get_created_cache(cache_worker.label, outdated, newcomers))
+    cache_worker.clear_local()
+    if observers:
+        observe(cache_worker.label, INVALIDATION, time.perf_counter() - started, count=result.rebuilt)
+
+
+def invalidate_many_process(cache_worker: CacheWorker, changes: List[Tuple[Dict, Dict]]):
+    started = time.perf_counter()
+    result = rebuild_created_caches(cache_worker, get_created_cache_many(cache_worker.label, changes))
+    cache_worker.clear_local()
+    if observers:
+        observe(cache_worker.label, INVALIDATION, time.perf_counter() - started, count=result.rebuilt)
+
+
+def apply_deltas(cache_worker: CacheWorker, deltas: List[Tuple[Optional[Dict], Optional[Dict], Any, str]]):
+    # Found values are patched by changed instances, values which can't be patched are rebuilt
+    started = time.perf_counter()
+    logs = list(
+        get_created_cache_many(cache_worker.label, [(outdated, newcomers) for outdated, newcomers, _, _ in deltas])
+        .values_list("key", "attributes")
+    )
+    changes = [(instance, operation) for _, _, instance, operation in deltas]
+    failed = [
+        (key, attributes) for key, attributes in logs
+        if attributes.get("args") or not patch_value(cache_worker, key, attributes.get("kwargs") or {}, changes)
+    ]
+    if failed:
+        rebuild_created_caches(cache_worker, failed)
+    cache_worker.clear_local()
+    if observers:
+        observe(cache_worker.label, INVALIDATION, time.perf_counter() - started, count=len(logs))
 
 
-def invalidate_by_relevance_expires():
-    to_invalidation = CreatedCache.objects.filter(
-        is_relevance_invalidation=True,
-        relevance_to__lte=datetime.now()
-    )
-    for cached_object in to_invalidation:
-        cache_worker = workers_collection.get(cached_object.label)
-        invalidate_created_caches(cached_object, cache_worker)
+def invalidate_all_process(cache_worker):
+    started = time.perf_counter()
+    result = rebuild_created_caches(cache_worker, get_created_cache(cache_worker.label))
+    cache_worker.clear_local()
+    if observers:
+        observe(cache_worker.label, INVALIDATION, time.perf_counter() - started, count=result.rebuilt)
+
+
+def invalidate_tags(*tags: Tag) -> int:
+    # Keys are found by tags index in cache, logs are read only to rebuild values
+    tagged = defaultdict(list)
+    for label, key in pop_tagged(tags):
+        tagged[label].append(key)
+    for label, keys in tagged.items():
+        started = time.perf_counter()
+        cache_worker = workers_collection.get(label)
+        if not cache_worker or cache_worker.invalidation_strategy == DELETE:
+            cache.delete_many(keys)
+        else:
+            log_buffer.flush()
+            logged = list(CreatedCache.objects.filter(key__in=keys).values_list("key", "attributes"))
+            rebuild_created_caches(cache_worker, logged)
+            # Not logged values can't be rebuilt
+            cache.delete_many(set(keys) - {key for key, _ in logged})
+        if cache_worker:
+            cache_worker.clear_local()
+        if observers:
+            observe(label, INVALIDATION, time.perf_counter() - started, count=len(keys))
+    return sum(map(len, tagged.values()))
+
+
+def claim_relevance_expired(
+    chunk_size: int, lease: int, shard: int = 0, shards: int = 1, until: datetime = None
+) -> List[Tuple[str, str, Dict]]:
+    # Locked rows are skipped, claimed rows are leased by moving `relevance_to`,
+    # so concurrent sweepers never take same keys. Rebuilding logs new `relevance_to`.
+    now = datetime.now()
+    to_invalidation = CreatedCache.objects.filter(is_relevance_invalidation=True, relevance_to__lte=until or now)
+    if shards > 1:
+        to_invalidation = to_invalidation.annotate(shard=Mod("id", shards)).filter(shard=shard)
+    with transaction.atomic():
+        claimed = list(
+            to_invalidation
+            .select_for_update(skip_locked=True)
+            .order_by("relevance_to")
+            .values_list("id", "label", "key", "attributes")[:chunk_size]
+        )
+        CreatedCache.objects.filter(id__in=[row[0] for row in claimed]).update(
+            relevance_to=now + timedelta(seconds=lease)
+        )
+    return [row[1:] for row in claimed]
+
+
+def invalidate_by_relevance_expires(
+    *, shard: int = 0, shards: int = 1, chunk_size: int = None, lease: int = None
+) -> int:
+    log_buffer.flush()
+    chunk_size = chunk_size or default.RELEVANCE_SWEEP_CHUNK_SIZE
+    lease = lease or default.RELEVANCE_SWEEP_LEASE
+    invalidated_workers = set()
+    invalidated = 0
+    result = RebuildResult()
+    # Values rebuilt by this sweep are not taken again
+    started_at = datetime.now()
+    while True:
+        claimed = claim_relevance_expired(chunk_size, lease, shard, shards, started_at)
+        if not claimed:
+            break
+        batches = defaultdict(list)
+        for label, key, attributes in claimed:
+            batches[label].append((key, attributes))
+        for label, batch in batches.items():
+            cache_worker = workers_collection.get(label)
+            if not cache_worker:
+                continue
+            started = time.perf_counter()
+            batch_result = rebuild_batch(cache_worker, batch)
+            result += batch_result
+            invalidated_workers.add(cache_worker)
+            if observers:
+                observe(label, INVALIDATION, time.perf_counter() - started, count=batch_result.rebuilt)
+        invalidated += len(claimed)
+        logger.info(
+            "Relevance sweep shard %s/%s: %s values invalidated, %s rebuilt, %s deleted",
+            shard, shards, invalidated, result.rebuilt, result.deleted
+        )
+    for cache_worker in invalidated_workers:
+        cache_worker.clear_local()
+    return invalidated
 
 
 def lazy_invalidation(key: str):
+    log_buffer.flush()
     cached_object = CreatedCache.objects.filter(key=key).first()
+    if not cached_object:
+        return
+    started = time.perf_counter()
     cache_worker = workers_collection.get(cached_object.label)
-    invalidate_created_caches(cached_object, cache_worker)
+    # Value is in use, so it always must be rebuilt
+    invalidate_created_caches(cached_object, cache_worker, strategy=REBUILD)
+    cache_worker.clear_local()
+    if observers:
+        observe(cache_worker.label, INVALIDATION, time.perf_counter() - started)
 
 
 INVALIDATE = "i"
 INVALIDATE_ALL = "ia"
+INVALIDATE_MANY = "im"
 INVALIDATION_PROCESSES = {
     INVALIDATE: invalidate_process,
     INVALIDATE_ALL: invalidate_all_process,
+    INVALIDATE_MANY: invalidate_many_process,
 }
 
 
+def get_debounce_key(label: str, invalidation_type: str, args: Tuple, kwargs: Dict) -> str:
+    normalized = json.dumps([invalidation_type, args, kwargs], sort_keys=True, default=str)
+    return f"{label}||INVALIDATION||{blake2b(normalized.encode(), digest_size=16).hexdigest()}"
+
+
+def delay_invalidation(cache_worker: CacheWorker, invalidation_type: str, *args, **kwargs):
+    from ..tasks import run_invalidate_task, run_debounced_invalidate_task
+    if not default.DEBOUNCE_INVALIDATION:
+        run_invalidate_task.apply_async(
+            args=(invalidation_type, cache_worker.label, *args),
+            kwargs=kwargs,
+            countdown=cache_worker.delay_countdown
+        )
+        return
+    # Same invalidation is enqueued once until its task starts,
+    # token expires anyway if task was lost
+    if invalidation_type != INVALIDATE_ALL and cache.get(get_debounce_key(cache_worker.label, INVALIDATE_ALL, (), {})):
+        # Whole worker is waiting for invalidation already
+        return
+    debounce_key = get_debounce_key(cache_worker.label, invalidation_type, args, kwargs)
+    if not cache.add(debounce_key, True, cache_worker.delay_countdown + default.DEBOUNCE_INVALIDATION_TIMEOUT):
+        return
+    run_debounced_invalidate_task.apply_async(
+        args=(debounce_key, invalidation_type, cache_worker.label, *args),
+        kwargs=kwargs,
+        countdown=cache_worker.delay_countdown
+    )
+
+
 def get_invalidation_func(invalidation_type):
 
     def wrapped(cache_worker: CacheWorker, *args, **kwargs):
         is_delay = kwargs.pop("is_delay", False)
         if is_delay or cache_worker.delay_invalidation:
-            from ..tasks import run_invalidate_task
-            run_invalidate_task.apply_async(
-                args=(invalidation_type, cache_worker.label, *args),
-                kwargs=kwargs,
-                countdown=cache_worker.delay_countdown
-            )
+            delay_invalidation(cache_worker, invalidation_type, *args, **kwargs)
         else:
             INVALIDATION_PROCESSES.get(invalidation_type)(cache_worker, *args, **kwargs)
     return wrapped
@@ -131,3 +272,12 @@ def get_invalidation_func(invalidation_type):
 
 invalidate_all = get_invalidation_func(INVALIDATE_ALL)
 invalidate = get_invalidation_func(INVALIDATE)
+invalidate_many = get_invalidation_func(INVALIDATE_MANY)
+
+
+async def ainvalidate(cache_worker: CacheWorker, *args, **kwargs):
+    await sync_to_async(invalidate)(cache_worker, *args, **kwargs)
+
+
+async def ainvalidate_all(cache_worker: CacheWorker, **kwargs):
+    await sync_to_async(invalidate_all)(cache_worker, **kwargs)
@@ -1,3 +1,15 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from hashlib import blake2b
+from typing import Any, Callable, Dict, List, Union
+from uuid import UUID
+
+from django.db.models import Model
+from django.utils.module_loading import import_string
+
+from . import settings as default
+
+
 def split_args(splitter: str):
     def _split(items):
         return splitter.join(items)
@@ -25,3 +37,130 @@ def keygen(*args, **kwargs) -> str:
     args_string = arguments_splitter((str(arg) for arg in sorted(args)))
     kwargs_string = arguments_splitter(kwargs_items(kwargs))
     return arguments_group_splitter((args_string, kwargs_string))
+
+
+# Typed canonical keys.
+# Every value is prefixed by its type, so `1`, `"1"`, `True` and `None` give different keys,
+# positional arguments keep their order and falsy kwargs are not dropped.
+# Lists and tuples are encoded equally, because logged attributes are restored from json.
+
+def is_safe_key(key: str) -> bool:
+    # Control chars and space are not allowed in memcached keys
+    return key.isascii() and key.isprintable() and " " not in key
+
+
+def encode_str(value: str) -> str:
+    return f"s{len(value)}:{value}"
+
+
+def encode_sequence(value) -> str:
+    value_types = set(map(type, value))
+    if len(value_types) != 1:
+        return f"({','.join(map(encode_value, value))})"
+    # Homogeneous items are encoded without type dispatch per item
+    value_type = value_types.pop()
+    if value_type is int:
+        # Fast path for lists of ids, int repr is cheaper than str
+        return f"(i:{','.join(map(repr, value))})"
+    if value_type is str:
+        return f"({','.join([f's{len(item)}:{item}' for item in value])})"
+    return f"({','.join(map(ENCODERS.get(value_type, encode_value), value))})"
+
+
+def encode_set(value) -> str:
+    return f"{{{','.join(sorted(map(encode_value, value)))}}}"
+
+
+def encode_dict(value: dict) -> str:
+    items = sorted((str(key), item) for key, item in value.items())
+    return f"<{','.join(f'{encode_str(key)}={encode_value(item)}' for key, item in items)}>"
+
+
+ENCODERS: Dict[type, Callable[[Any], str]] = {
+    type(None): lambda value: "N",
+    bool: lambda value: "T" if value else "F",
+    int: lambda value: f"i{value}",
+    float: lambda value: f"f{value!r}",
+    str: encode_str,
+    bytes: lambda value: f"b{value.hex()}",
+    Decimal: lambda value: f"d{value.normalize()}",
+    datetime: lambda value: f"t{value.isoformat()}",
+    date: lambda value: f"D{value.isoformat()}",
+    time: lambda value: f"H{value.isoformat()}",
+    UUID: lambda value: f"u{value.hex}",
+    list: encode_sequence,
+    tuple: encode_sequence,
+    set: encode_set,
+    frozenset: encode_set,
+    dict: encode_dict,
+}
+
+
+def encode_value(value: Any) -> str:
+    encoder = ENCODERS.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    if isinstance(value, Model):
+        return f"m{value._meta.label}:{value.pk}"
+    for value_type, encoder in ENCODERS.items():
+        if isinstance(value, value_type):
+            return encoder(value)
+    return f"o{type(value).__qualname__}:{value}"
+
+
+def encode_parts(args: tuple, kwargs: dict) -> List[str]:
+    parts = [f"{name}={encode_value(kwargs[name])}" for name in sorted(kwargs)]
+    if args:
+        parts[:0] = map(encode_value, args)
+    return parts
+
+
+def encode_arguments(args: tuple, kwargs: dict) -> str:
+    return ",".join(encode_parts(args, kwargs))
+
+
+class TypedKeygen:
+    # Readable typed key, replaced by digest when too long or not memcached safe
+
+    def __init__(self, max_length: int = None, digest_size: int = None, is_hashed: bool = False):
+        self.max_length = default.KEYGEN_MAX_LENGTH if max_length is None else max_length
+        self.digest_size = default.KEYGEN_DIGEST_SIZE if digest_size is None else digest_size
+        self.is_hashed = is_hashed
+
+    def digest(self, key: str) -> str:
+        return "#" + blake2b(key.encode(), digest_size=self.digest_size).hexdigest()
+
+    def digest_parts(self, parts: List[str]) -> str:
+        # Same digest as of joined key, parts are hashed without joining
+        hasher = blake2b(parts[0].encode() if parts else b"", digest_size=self.digest_size)
+        for part in parts[1:]:
+            hasher.update(b",")
+            hasher.update(part.encode())
+        return "#" + hasher.hexdigest()
+
+    def __call__(self, *args, **kwargs) -> str:
+        parts = encode_parts(args, kwargs)
+        if self.is_hashed or sum(map(len, parts)) + len(parts) - 1 > self.max_length:
+            return self.digest_parts(parts)
+        key = ",".join(parts)
+        if not is_safe_key(key):
+            return self.digest(key)
+        return key
+
+
+typed_keygen = TypedKeygen()
+hashed_keygen = TypedKeygen(is_hashed=True)
+
+KEYGENS: Dict[str, Callable[..., str]] = {
+    "default": keygen,
+    "typed": typed_keygen,
+    "hashed": hashed_keygen,
+}
+
+
+def get_keygen(key_gen: Union[str, Callable[..., str], None]) -> Callable[..., str]:
+    if key_gen is None:
+        return keygen
+    if isinstance(key_gen, str):
+        return KEYGENS[key_gen] if key_gen in KEYGENS else import_string(key_gen)
+    return key_gen
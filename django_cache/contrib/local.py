@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+import pickle
+import threading
+import time
+
+from django.core.cache import cache
+
+from .aio import acache
+from .save import CachedEntity
+from . import settings as default
+
+
+def get_version_key(label):
+    return f"{label}||VERSION"
+
+
+def bump_version(label):
+    key = get_version_key(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+class LocalCache:
+    # In-process LRU tier in front of django cache.
+    # Entries stored with their deadline and approximate size.
+    entries: "OrderedDict[str, Tuple[datetime, int, CachedEntity]]"
+
+    def __init__(self, label: str, max_size: int, max_bytes: Optional[int] = None):
+        self.label = label
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.check_interval = default.LOCAL_CACHE_CHECK_INTERVAL
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.version = None
+        self.checked_at = 0.0
+        self.lock = threading.RLock()
+
+    def refresh(self):
+        # Check shared version, clear all values if it was changed in other process
+        if self._is_checked():
+            return
+        self._check_version(cache.get(get_version_key(self.label)))
+
+    async def arefresh(self):
+        if self._is_checked():
+            return
+        self._check_version(await acache("get", get_version_key(self.label)))
+
+    def get(self, key: str) -> Optional[CachedEntity]:
+        self.refresh()
+        return self._get(key)
+
+    async def aget(self, key: str) -> Optional[CachedEntity]:
+        await self.arefresh()
+        return self._get(key)
+
+    def _is_checked(self) -> bool:
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return True
+        self.checked_at = now
+        return False
+
+    def _check_version(self, version):
+        if version != self.version:
+            with self.lock:
+                self.version = version
+                self._clear()
+
+    def _get(self, key: str) -> Optional[CachedEntity]:
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            deadline, _, entity = item
+            if deadline <= datetime.now():
+                self._pop(key)
+                return None
+            self.entries.move_to_end(key)
+            return entity
+
+    def set(self, key: str, entity: CachedEntity):
+        deadline = min(entity.available_to, entity.relevance_to)
+        size = len(pickle.dumps(entity.value, pickle.HIGHEST_PROTOCOL)) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self.lock:
+            self._pop(key)
+            self.entries[key] = (deadline, size, entity)
+            self.total_bytes += size
+            while len(self.entries) > self.max_size or (
+                self.max_bytes and self.total_bytes > self.max_bytes
+            ):
+                self._pop(next(iter(self.entries)))
+
+    def delete(self, key: str):
+        with self.lock:
+            self._pop(key)
+
+    def clear(self):
+        bump_version(self.label)
+        with self.lock:
+            self._clear()
+
+    def _pop(self, key: str):
+        item = self.entries.pop(key, None)
+        if item is not None:
+            self.total_bytes -= item[1]
+
+    def _clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import Dict, List
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from .aio import acache
+
+
+def get_precache_key(key):
+    return f"{key}||PRECACHE"
+
+
+class _Waiter:
+    # Event shared by waiters of key in current process
+    __slots__ = ("event", "count")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.count = 0
+
+
+# In-process waiters, woken up as soon as the lock owner releases the key.
+# Entry is removed by last waiter, so keys of other processes' locks are not kept.
+_waiters: Dict[str, _Waiter] = {}
+_waiters_lock = threading.Lock()
+
+
+def _wait(key: str, timeout: float):
+    with _waiters_lock:
+        waiter = _waiters.get(key)
+        if waiter is None:
+            waiter = _waiters[key] = _Waiter()
+        waiter.count += 1
+    try:
+        waiter.event.wait(timeout)
+    finally:
+        with _waiters_lock:
+            waiter.count -= 1
+            if not waiter.count and _waiters.get(key) is waiter:
+                del _waiters[key]
+
+
+def _notify_waiters(key: str):
+    with _waiters_lock:
+        waiter = _waiters.pop(key, None)
+    if waiter is not None:
+        waiter.event.set()
+
+
+# Cache-wide lock which allows only one process to build a key.
+# Claimed atomically with `cache.add` and tagged by owner token.
+class SingleFlightLock:
+
+    def __init__(self, key: str, timeout: int):
+        self.key = get_precache_key(key)
+        self.timeout = timeout
+        self.token = uuid4().hex
+        self.is_owner = False
+
+    def acquire(self) -> bool:
+        if not self.is_owner:
+            self.is_owner = cache.add(self.key, self.token, self.timeout)
+        return self.is_owner
+
+    def release(self):
+        if not self.is_owner:
+            return
+        if cache.get(self.key) == self.token:
+            cache.delete(self.key)
+        self.is_owner = False
+        _notify_waiters(self.key)
+
+    async def aacquire(self) -> bool:
+        if not self.is_owner:
+            self.is_owner = await acache("add", self.key, self.token, self.timeout)
+        return self.is_owner
+
+    async def arelease(self):
+        if not self.is_owner:
+            return
+        if await acache("get", self.key) == self.token:
+            await acache("delete", self.key)
+        self.is_owner = False
+        _notify_waiters(self.key)
+
+    def wait(self, timeout: float):
+        # Wake up on local release, otherwise re-check after timeout
+        _wait(self.key, timeout)
+
+    def acquire_waiting(self, timeout: float, tick: float) -> bool:
+        # Claim the key after current owner releases it
+        deadline = time.monotonic() + timeout
+        while not self.acquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.wait(min(tick, remaining))
+        return True
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def release_many(locks: List[SingleFlightLock]):
+    # Delete in one request keys which are still claimed by their owners
+    owned = {lock.key: lock.token for lock in locks if lock.is_owner}
+    if not owned:
+        return
+    stored = cache.get_many(list(owned))
+    cache.delete_many([key for key, token in owned.items() if stored.get(key) == token])
+    for lock in locks:
+        if lock.is_owner:
+            lock.is_owner = False
+            _notify_waiters(lock.key)
@@ -0,0 +1,54 @@
+from collections import defaultdict
+from typing import Any, List, NamedTuple
+
+from django.apps import apps
+from django.db.models import QuerySet
+
+
+INSTANCES = "instances"
+IDS = "ids"
+VALUES = "values"
+VALUES_LIST = "values_list"
+
+
+class ModelIds(NamedTuple):
+    model: str
+    ids: List[Any]
+
+
+def materialize(value: Any, mode: str) -> Any:
+    # Only querysets are materialized, other values are stored as is
+    if not isinstance(value, QuerySet):
+        return value
+    if mode == INSTANCES:
+        # Evaluate now, not while pickling
+        len(value)
+        return value
+    if mode == IDS:
+        return ModelIds(value.model._meta.label, list(value.values_list("pk", flat=True)))
+    if mode == VALUES:
+        return list(value.values())
+    if mode == VALUES_LIST:
+        return list(value.values_list())
+    raise ValueError(f"Unknown materialization mode: {mode}")
+
+
+def dematerialize(value: Any) -> Any:
+    return dematerialize_many([value])[0]
+
+
+def dematerialize_many(values: List[Any]) -> List[Any]:
+    # Rehydrate instances of all values with one query per model and keep stored ordering
+    ids = defaultdict(set)
+    for value in values:
+        if isinstance(value, ModelIds):
+            ids[value.model].update(value.ids)
+    objects = {
+        model: apps.get_model(model)._default_manager.in_bulk(list(model_ids))
+        for model, model_ids in ids.items()
+    }
+    return [
+        [objects[value.model][pk] for pk in value.ids if pk in objects[value.model]]
+        if isinstance(value, ModelIds) else value
+        for value in values
+    ]
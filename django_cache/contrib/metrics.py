@@ -0,0 +1,187 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import socket
+import threading
+import time
+
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+
+from . import settings as default
+
+
+# Events
+HIT = "hit"
+MISS = "miss"
+WAIT = "wait"
+STALE = "stale"
+EARLY_REFRESH = "early_refresh"
+INVALIDATION = "invalidation"
+
+# Observer receives label, event, duration in seconds (or None) and count of values
+Observer = Callable[[str, str, Optional[float], int], None]
+
+# Empty list means disabled instrumentation, callers check it before any measuring
+observers: List[Observer] = []
+
+cache_event = Signal()
+
+METRICS_PROCESSES_KEY = "django_cache||METRICS"
+
+
+def get_metrics_key(process_id: str):
+    return f"{METRICS_PROCESSES_KEY}||{process_id}"
+
+
+def observe(label: str, event: str, duration: float = None, count: int = 1):
+    for observer in observers:
+        observer(label, event, duration, count)
+
+
+def timed(label: str, event: str, func: Callable, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    observe(label, event, time.perf_counter() - started)
+    return result
+
+
+def send_signal(label: str, event: str, duration: Optional[float], count: int):
+    cache_event.send(sender=None, label=label, event=event, duration=duration, count=count)
+
+
+class MetricsCollector:
+    # In-process counters and duration histograms by label and event
+
+    def __init__(self, buckets: Tuple[float, ...], publish_interval: float = None):
+        self.buckets = tuple(sorted(buckets))
+        self.publish_interval = publish_interval
+        self.published_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.counters: Dict[Tuple[str, str], int] = {}
+        # Count by bucket (last one is +Inf), sum of durations
+        self.histograms: Dict[Tuple[str, str], Tuple[List[int], List[float]]] = {}
+
+    def __call__(self, label: str, event: str, duration: Optional[float], count: int):
+        name = (label, event)
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+            if duration is None:
+                return
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = ([0] * (len(self.buckets) + 1), [0.0])
+            histogram[0][bisect_left(self.buckets, duration)] += 1
+            histogram[1][0] += duration
+        if self.publish_interval and time.monotonic() - self.published_at >= self.publish_interval:
+            self.publish()
+
+    def dump(self) -> Tuple[Dict, Dict]:
+        with self.lock:
+            return (
+                dict(self.counters),
+                {name: (list(buckets), list(total)) for name, (buckets, total) in self.histograms.items()},
+            )
+
+    def merge(self, data: Tuple[Dict, Dict]):
+        counters, histograms = data
+        with self.lock:
+            for name, count in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + count
+            for name, (buckets, total) in histograms.items():
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = ([0] * (len(self.buckets) + 1), [0.0])
+                for i, count in enumerate(buckets):
+                    histogram[0][i] += count
+                histogram[1][0] += total[0]
+
+    def publish(self):
+        # Share process metrics, so they can be collected from any process
+        self.published_at = time.monotonic()
+        process_id = f"{socket.gethostname()}:{os.getpid()}"
+        cache.set(get_metrics_key(process_id), self.dump(), self.publish_interval * 10)
+        processes = cache.get(METRICS_PROCESSES_KEY) or []
+        if process_id not in processes:
+            cache.set(METRICS_PROCESSES_KEY, [*processes, process_id], None)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self.lock:
+            result = {}
+            for (label, event), count in sorted(self.counters.items()):
+                result.setdefault(label, {})[event] = {"count": count}
+            for (label, event), (buckets, total) in self.histograms.items():
+                result[label][event].update({
+                    "sum": total[0],
+                    "buckets": dict(zip([*map(str, self.buckets), "+Inf"], buckets)),
+                })
+        for events in result.values():
+            hits = events.get(HIT, {}).get("count", 0)
+            requests = hits + events.get(MISS, {}).get("count", 0)
+            if requests:
+                events["hit_ratio"] = hits / requests
+        return result
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP django_cache_events_total Count of cache worker events.",
+            "# TYPE django_cache_events_total counter",
+        ]
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((name, (list(buckets), total[0])) for name, (buckets, total) in self.histograms.items())
+        for (label, event), count in counters:
+            lines.append(f"django_cache_events_total{{{format_labels(label, event)}}} {count}")
+        lines += [
+            "# HELP django_cache_duration_seconds Duration of cache worker events.",
+            "# TYPE django_cache_duration_seconds histogram",
+        ]
+        for (label, event), (buckets, total) in histograms:
+            labels = format_labels(label, event)
+            cumulative = 0
+            for bound, count in zip([*map(str, self.buckets), "+Inf"], buckets):
+                cumulative += count
+                lines.append(f'django_cache_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"django_cache_duration_seconds_sum{{{labels}}} {total}")
+            lines.append(f"django_cache_duration_seconds_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def escape_label_value(value: str) -> str:
+    # Prometheus text format escapes backslash, double quote and line feed
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(label: str, event: str) -> str:
+    return f'label="{escape_label_value(label)}",event="{escape_label_value(event)}"'
+
+
+def load_published() -> MetricsCollector:
+    # Sum of metrics published by all processes
+    published = MetricsCollector(default.METRICS_BUCKETS)
+    processes = cache.get(METRICS_PROCESSES_KEY) or []
+    dumps = cache.get_many([get_metrics_key(process_id) for process_id in processes])
+    for data in dumps.values():
+        published.merge(data)
+    if len(dumps) < len(processes):
+        # Forget expired processes
+        cache.set(METRICS_PROCESSES_KEY, [
+            process_id for process_id in processes if get_metrics_key(process_id) in dumps
+        ], None)
+    return published
+
+
+collector = MetricsCollector(default.METRICS_BUCKETS, default.METRICS_PUBLISH_INTERVAL)
+
+
+def setup_observers():
+    observers.clear()
+    if default.METRICS:
+        observers.append(collector)
+    observers.extend(import_string(path) for path in default.METRICS_OBSERVERS)
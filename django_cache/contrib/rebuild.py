@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Dict, Set, Union
+import time
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import QuerySet
+
+from ..models import CreatedCache
+from .cache import CacheWorker, DELETE, REBUILD_IF_HOT, get_hits_key
+from . import settings as default
+
+
+CacheLogItem = Tuple[str, Dict]
+
+
+class RebuildResult(NamedTuple):
+    # Cold values are deleted instead of rebuilding
+    rebuilt: int = 0
+    deleted: int = 0
+
+    def __add__(self, other: "RebuildResult") -> "RebuildResult":
+        return RebuildResult(self.rebuilt + other.rebuilt, self.deleted + other.deleted)
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def rate_limited(batches: Iterable[List], rate_limit: Optional[float]) -> Iterator[List]:
+    # Keep average amount of rebuilt keys per second under the limit
+    started_at = time.monotonic()
+    count = 0
+    for batch in batches:
+        if rate_limit:
+            delay = count / rate_limit - (time.monotonic() - started_at)
+            if delay > 0:
+                time.sleep(delay)
+        count += len(batch)
+        yield batch
+
+
+def get_cold_keys(cache_worker: CacheWorker, keys: List[str], strategy: str) -> Set[str]:
+    if strategy == DELETE:
+        return set(keys)
+    if strategy == REBUILD_IF_HOT:
+        hits = cache.get_many([get_hits_key(key) for key in keys])
+        return {key for key in keys if hits.get(get_hits_key(key), 0) < cache_worker.hot_hits}
+    return set()
+
+
+def delete_created_caches(keys: Iterable[str]):
+    keys = list(keys)
+    cache.delete_many(keys)
+    CreatedCache.objects.filter(key__in=keys).delete()
+
+
+def rebuild_batch(
+    cache_worker: CacheWorker,
+    batch: List[CacheLogItem],
+    *,
+    strategy: str = None,
+    is_delete: bool = True
+) -> RebuildResult:
+    strategy = strategy or cache_worker.invalidation_strategy
+    cold_keys = get_cold_keys(cache_worker, [key for key, _ in batch], strategy)
+    if cold_keys:
+        # Will be built on next getting
+        delete_created_caches(cold_keys)
+    arguments = {}
+    rebuilt_keys = []
+    outdated_keys = []
+    for key, attributes in batch:
+        if key in cold_keys:
+            continue
+        rebuilt_keys.append(key)
+        args, kwargs = attributes.get("args") or (), attributes.get("kwargs") or {}
+        if args:
+            # Positional arguments can't be built in batch
+            cache_worker.save(*args, **kwargs)
+            continue
+        arguments[key] = kwargs
+    for key, new_key in zip(arguments, cache_worker.get_keys(arguments.values())):
+        if key != new_key:
+            outdated_keys.append(key)
+    cache_worker.save_many(arguments.values())
+    if strategy == REBUILD_IF_HOT and rebuilt_keys:
+        # Count hits from scratch for new value
+        cache.delete_many([get_hits_key(key) for key in rebuilt_keys])
+    if is_delete and outdated_keys:
+        CreatedCache.objects.filter(key__in=outdated_keys).delete()
+    return RebuildResult(rebuilt=len(rebuilt_keys), deleted=len(cold_keys))
+
+
+def rebuild_batch_in_thread(
+    cache_worker: CacheWorker, batch: List[CacheLogItem], strategy: str = None
+) -> RebuildResult:
+    try:
+        return rebuild_batch(cache_worker, batch, strategy=strategy)
+    finally:
+        connections.close_all()
+
+
+def rebuild_created_caches(
+    cache_worker: CacheWorker,
+    created_caches: Union[QuerySet, Iterable[CacheLogItem]],
+    *,
+    batch_size: int = None,
+    workers: int = None,
+    rate_limit: float = None,
+    strategy: str = None
+) -> RebuildResult:
+    batch_size = batch_size or default.REBUILD_BATCH_SIZE
+    workers = workers or default.REBUILD_WORKERS
+    rate_limit = rate_limit or default.REBUILD_RATE_LIMIT
+    if isinstance(created_caches, QuerySet):
+        created_caches = created_caches.values_list("key", "attributes").iterator(chunk_size=batch_size)
+    batches = rate_limited(chunked(created_caches, batch_size), rate_limit)
+    if workers <= 1:
+        return sum((rebuild_batch(cache_worker, batch, strategy=strategy) for batch in batches), RebuildResult())
+
+    result = RebuildResult()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="django_cache_rebuild") as executor:
+        in_progress = set()
+        for batch in batches:
+            # Don't read more rows than workers can handle
+            if len(in_progress) >= workers * 2:
+                done, in_progress = wait(in_progress, return_when=FIRST_COMPLETED)
+                result += sum((future.result() for future in done), RebuildResult())
+            in_progress.add(executor.submit(rebuild_batch_in_thread, cache_worker, batch, strategy))
+        result += sum((future.result() for future in in_progress), RebuildResult())
+    return result
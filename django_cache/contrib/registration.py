@@ -1,4 +1,4 @@
-from typing import Dict, Union, Callable, Any, Optional
+from typing import Dict, Union, Callable, Any, Optional, List
 from django.conf import settings
 from django.utils.module_loading import import_string
 
@@ -10,8 +10,12 @@ _CREATION_FIELDS = (
     "structure_getter", "expires",
     "key_gen", "tick_amount", "tick", "cached_entity",
     "delay_invalidation", "relevance_invalidation",
-    "relevance_expires", "delay_countdown", "delay_logging",
-    "is_concurrent"
+    "relevance_expires", "delay_countdown", "delay_logging", "buffer_logging",
+    "is_concurrent", "lock_expires", "stale_while_revalidate",
+    "local_cache", "local_cache_size", "local_cache_bytes",
+    "many_structure_getter", "invalidation_strategy", "hot_hits",
+    "generations", "codec", "materialization",
+    "early_refresh", "early_refresh_beta", "expires_jitter", "apply_delta"
 )
 
 
@@ -40,17 +44,33 @@ class WorkersCollection:
         relevance_expires: int = default.DEFAULT_RELEVANCE_EXPIRES,
         delay_countdown: int = default.DEFAULT_DELAY_COUNTDOWN,
         delay_logging: bool = default.DEFAULT_DELAY_LOGGING,
+        buffer_logging: bool = default.DEFAULT_BUFFER_LOGGING,
         is_concurrent: bool = default.IS_CONCURRENT,
+        lock_expires: int = default.DEFAULT_LOCK_EXPIRES,
+        stale_while_revalidate: bool = default.DEFAULT_STALE_WHILE_REVALIDATE,
+        local_cache: bool = default.DEFAULT_LOCAL_CACHE,
+        local_cache_size: int = default.DEFAULT_LOCAL_CACHE_SIZE,
+        local_cache_bytes: int = default.DEFAULT_LOCAL_CACHE_BYTES,
+        many_structure_getter: Union[str, Callable[[List[Dict]], List[Any]]] = None,
+        invalidation_strategy: str = default.DEFAULT_INVALIDATION_STRATEGY,
+        hot_hits: int = default.DEFAULT_HOT_HITS,
+        generations: bool = default.DEFAULT_GENERATIONS,
+        codec: str = default.DEFAULT_CODEC,
+        materialization: str = default.DEFAULT_MATERIALIZATION,
+        early_refresh: bool = default.DEFAULT_EARLY_REFRESH,
+        early_refresh_beta: float = default.DEFAULT_EARLY_REFRESH_BETA,
+        expires_jitter: float = default.DEFAULT_EXPIRES_JITTER,
+        apply_delta: Union[str, Callable, None] = None,
     ):
         structure_getter = (
             import_string(structure_getter)
             if isinstance(structure_getter, str)
             else structure_getter
         )
-        key_gen = (
-            import_string(key_gen)
-            if isinstance(key_gen, str)
-            else key_gen
+        many_structure_getter = (
+            import_string(many_structure_getter)
+            if isinstance(many_structure_getter, str)
+            else many_structure_getter
         )
         worker = CacheWorker(
             structure_getter=structure_getter,
@@ -65,7 +85,23 @@ class WorkersCollection:
             relevance_expires=relevance_expires,
             delay_countdown=delay_countdown,
             delay_logging=delay_logging,
+            buffer_logging=buffer_logging,
             is_concurrent=is_concurrent,
+            lock_expires=lock_expires,
+            stale_while_revalidate=stale_while_revalidate,
+            local_cache=local_cache,
+            local_cache_size=local_cache_size,
+            local_cache_bytes=local_cache_bytes,
+            many_structure_getter=many_structure_getter,
+            invalidation_strategy=invalidation_strategy,
+            hot_hits=hot_hits,
+            generations=generations,
+            codec=codec,
+            materialization=materialization,
+            early_refresh=early_refresh,
+            early_refresh_beta=early_refresh_beta,
+            expires_jitter=expires_jitter,
+            apply_delta=apply_delta,
             # To get around circle import exception
             is_register=False
         )
@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import threading
+
+from django.core.cache import cache
+from django.db import connections
+
+from . import settings as default
+
+
+def get_revalidation_key(key):
+    return f"{key}||REVALIDATE"
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=default.REVALIDATION_WORKERS,
+                thread_name_prefix="django_cache_revalidation"
+            )
+        return _executor
+
+
+def revalidate_key(key: str):
+    from .invalidation import lazy_invalidation
+    try:
+        lazy_invalidation(key)
+    finally:
+        cache.delete(get_revalidation_key(key))
+
+
+def run_in_thread(key: str):
+    try:
+        revalidate_key(key)
+    finally:
+        # Pool threads must not keep own database connections opened
+        connections.close_all()
+
+
+def revalidate(key: str, timeout: int, is_delay: bool = False) -> bool:
+    # Only one refresh per key across all processes
+    if not cache.add(get_revalidation_key(key), True, timeout):
+        return False
+    if is_delay:
+        from ..tasks import lazy_invalidation_task
+        lazy_invalidation_task.delay(key)
+    else:
+        get_executor().submit(run_in_thread, key)
+    return True
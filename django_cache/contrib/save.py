@@ -1,9 +1,15 @@
-from typing import NamedTuple, Any
+from typing import NamedTuple, Any, Dict, List, Tuple, Optional, Callable
 from datetime import datetime
+import atexit
+import threading
 
+import django
 from django.core.cache import cache
+from django.db import connections, router, transaction, IntegrityError
 
 from django_cache.models import CreatedCache
+from .attributes import get_logged_attributes, log_cache_attributes
+from . import settings as default
 
 
 class CachedEntity(NamedTuple):
@@ -15,14 +21,20 @@ class CachedEntity(NamedTuple):
     relevance_to: datetime
     available_to: datetime
     value: Any
+    # Seconds spent to build value
+    build_time: float = 0.0
 
     def to_cache(self):
-        return {
+        data = {
             "value": self.value,
             "expires": self.expires,
             "created_at": self.created_at,
             **self.get_info()
         }
+        if self.build_time:
+            # Stored for early refresh only, otherwise format is readable by old versions
+            data["build_time"] = self.build_time
+        return data
 
     def get_info(self):
         return {
@@ -33,6 +45,13 @@ class CachedEntity(NamedTuple):
             "is_relevance_invalidation": self.is_relevance_invalidation,
         }
 
+    def get_log_args(self, *args):
+        # Positional arguments of `log_cache_value`
+        return (
+            self.label, self.key, self.is_relevance_invalidation,
+            self.available_to, self.relevance_to, *args
+        )
+
 
 def serialize_attributes(*args, **kwargs):
     # NOTE: Contain list type in kwargs values
@@ -52,11 +71,8 @@ def serialize_attributes(*args, **kwargs):
     }
 
 
-def log_cache_value(label, key, is_relevance_invalidation, available_to, relevance_to, *args, **kwargs):
-    # Delete exists cache logs with current arguments
-    CreatedCache.objects.filter(key=key).delete()
-    # Create new log
-    return CreatedCache.objects.create(
+def build_cache_log(label, key, is_relevance_invalidation, available_to, relevance_to, *args, **kwargs):
+    return CreatedCache(
         key=key,
         label=label,
         is_relevance_invalidation=is_relevance_invalidation,
@@ -66,11 +82,184 @@ def log_cache_value(label, key, is_relevance_invalidation, available_to, relevan
     )
 
 
-def cache_value(cache_entity: CachedEntity, is_delay=False, *args, **kwargs):
-    cache.set(cache_entity.key, cache_entity.to_cache(), cache_entity.expires)
-    kwargs.update(cache_entity.get_info())
+def log_cache_value(label, key, is_relevance_invalidation, available_to, relevance_to, *args, **kwargs):
+    cache_log = build_cache_log(
+        label, key, is_relevance_invalidation, available_to, relevance_to, *args, **kwargs
+    )
+    return upsert_cache_logs([cache_log])[0]
+
+
+def log_cache_values(cache_entities: List[Tuple[CachedEntity, Dict]]):
+    return upsert_cache_logs([
+        build_cache_log(*entity.get_log_args(), **kwargs)
+        for entity, kwargs in cache_entities
+    ])
+
+
+# `bulk_create(update_conflicts=...)` available since django 4.1
+IS_UPSERT_SUPPORTED = django.VERSION >= (4, 1)
+UPSERT_FIELDS = (
+    "label", "attributes", "created_at",
+    "is_relevance_invalidation", "available_to", "relevance_to",
+)
+# Rows in one `INSERT`, PostgreSQL allows 65535 parameters in query
+UPSERT_BATCH_SIZE = 1000
+
+
+def upsert_cache_logs(cache_logs: List[CreatedCache]) -> List[CreatedCache]:
+    # Replace exists logs with same keys, `key` is unique
+    cache_logs = list({cache_log.key: cache_log for cache_log in cache_logs}.values())
+    try:
+        return _upsert_cache_logs(cache_logs)
+    except IntegrityError:
+        # Same key was logged by concurrent process
+        return _upsert_cache_logs(cache_logs)
+
+
+def _upsert_cache_logs(cache_logs: List[CreatedCache]) -> List[CreatedCache]:
+    connection = connections[router.db_for_write(CreatedCache)]
+    with transaction.atomic(using=connection.alias):
+        logged = get_logged_attributes([cache_log.key for cache_log in cache_logs])
+        if connection.vendor == "postgresql":
+            for start in range(0, len(cache_logs), UPSERT_BATCH_SIZE):
+                _pg_upsert_cache_logs(connection, cache_logs[start:start + UPSERT_BATCH_SIZE])
+        elif IS_UPSERT_SUPPORTED:
+            CreatedCache.objects.bulk_create(
+                cache_logs,
+                update_conflicts=True,
+                unique_fields=("key", ),
+                update_fields=UPSERT_FIELDS,
+            )
+        else:
+            CreatedCache.objects.filter(key__in=logged).delete()
+            CreatedCache.objects.bulk_create(cache_logs)
+            # Attributes of replaced logs are deleted by cascade
+            logged = {}
+        log_cache_attributes(cache_logs, logged)
+    return cache_logs
+
+
+def _pg_upsert_cache_logs(connection, cache_logs: List[CreatedCache]):
+    # `INSERT ... ON CONFLICT` keeps ids of logged keys, ids are returned for all rows
+    meta = CreatedCache._meta
+    quote = connection.ops.quote_name
+    fields = [meta.get_field(name) for name in ("key", *UPSERT_FIELDS)]
+    row = "({})".format(", ".join(["%s"] * len(fields)))
+    sql = (
+        f"INSERT INTO {quote(meta.db_table)} ({', '.join(quote(field.column) for field in fields)}) "
+        f"VALUES {', '.join([row] * len(cache_logs))} "
+        f"ON CONFLICT ({quote(meta.get_field('key').column)}) DO UPDATE SET "
+        + ", ".join(f"{quote(field.column)} = EXCLUDED.{quote(field.column)}" for field in fields[1:])
+        + f" RETURNING {quote(meta.get_field('key').column)}, {quote(meta.pk.column)}"
+    )
+    params = [
+        field.get_db_prep_save(field.pre_save(cache_log, True), connection)
+        for cache_log in cache_logs
+        for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        ids = dict(cursor.fetchall())
+    for cache_log in cache_logs:
+        cache_log.id = ids[cache_log.key]
+
+
+class LogBuffer:
+    # Collects cache logs in process and writes them in bulk,
+    # when buffer is full or after timeout since first record.
+    records: Dict[str, Tuple[CachedEntity, Tuple, Dict]]
+    timer: Optional[threading.Timer]
+
+    def __init__(self, size: int, timeout: float):
+        self.size = size
+        self.timeout = timeout
+        self.records = {}
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def add(self, cache_entity: CachedEntity, args: Tuple, kwargs: Dict):
+        with self.lock:
+            # Value is not needed for logging, so don't hold it in memory
+            self.records[cache_entity.key] = (cache_entity._replace(value=None), args, kwargs)
+            is_full = len(self.records) >= self.size
+            if not is_full and self.timer is None:
+                self.timer = threading.Timer(self.timeout, self.flush_in_thread)
+                self.timer.daemon = True
+                self.timer.start()
+        if is_full:
+            self.flush()
+
+    def flush(self) -> int:
+        with self.lock:
+            records = list(self.records.values())
+            self.records = {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if records:
+            upsert_cache_logs([
+                build_cache_log(*entity.get_log_args(*args), **kwargs)
+                for entity, args, kwargs in records
+            ])
+        return len(records)
+
+    def flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+
+log_buffer = LogBuffer(default.LOG_BUFFER_SIZE, default.LOG_BUFFER_TIMEOUT)
+atexit.register(log_buffer.flush)
+
+
+def flush_cache_logs(*args, **kwargs):
+    return log_buffer.flush()
+
+
+def cache_value(
+    cache_entity: CachedEntity,
+    is_delay=False,
+    is_buffer=False,
+    encode: Callable[[CachedEntity], Any] = CachedEntity.to_cache,
+    *args, **kwargs
+):
+    cache.set(cache_entity.key, encode(cache_entity), cache_entity.expires)
+    log_entity(cache_entity, is_delay, is_buffer, *args, **kwargs)
+
+
+def log_entity(cache_entity: CachedEntity, is_delay=False, is_buffer=False, *args, **kwargs):
+    if is_buffer:
+        log_buffer.add(cache_entity, args, kwargs)
+        return
     if is_delay:
         from ..tasks import create_cache_log_task
-        create_cache_log_task.delay(*args, **kwargs)
+        create_cache_log_task.delay(*cache_entity.get_log_args(*args), **kwargs)
+    else:
+        log_cache_value(*cache_entity.get_log_args(*args), **kwargs)
+
+
+def cache_values(
+    cache_entities: List[Tuple[CachedEntity, Dict]],
+    is_delay=False,
+    is_buffer=False,
+    encode: Callable[[CachedEntity], Any] = CachedEntity.to_cache
+):
+    if not cache_entities:
+        return
+    # One request for every expires, values with jitter have different ones
+    values = {}
+    for entity, _ in cache_entities:
+        values.setdefault(entity.expires, {})[entity.key] = encode(entity)
+    for expires, expires_values in values.items():
+        cache.set_many(expires_values, expires)
+    if is_buffer:
+        for entity, kwargs in cache_entities:
+            log_buffer.add(entity, (), kwargs)
+    elif is_delay:
+        from ..tasks import create_cache_log_task
+        for entity, kwargs in cache_entities:
+            create_cache_log_task.delay(*entity.get_log_args(), **kwargs)
     else:
-        log_cache_value(*args, **kwargs)
+        log_cache_values(cache_entities)
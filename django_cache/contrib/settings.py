@@ -1,11 +1,11 @@
 from django.conf import settings
 
-from .keygen import keygen
-
 
 DEFAULT_TICK_AMOUNT = getattr(settings, "DJANGO_CACHE_DEFAULT_TICK_AMOUNT", 10)
 DEFAULT_TICK_SIZE = getattr(settings, "DJANGO_CACHE_DEFAULT_TICK_SIZE", 0.1)
-DEFAULT_KEYGEN = getattr(settings, "DJANGO_CACHE_DEFAULT_KEYGEN", keygen)
+DEFAULT_KEYGEN = getattr(settings, "DJANGO_CACHE_DEFAULT_KEYGEN", "default")
+KEYGEN_MAX_LENGTH = getattr(settings, "DJANGO_CACHE_KEYGEN_MAX_LENGTH", 200)
+KEYGEN_DIGEST_SIZE = getattr(settings, "DJANGO_CACHE_KEYGEN_DIGEST_SIZE", 16)
 DEFAULT_EXPIRES = getattr(settings, "DJANGO_CACHE_DEFAULT_EXPIRES", None)
 DEFAULT_DELAY_INVALIDATION = getattr(settings, "DJANGO_CACHE_DEFAULT_DELAY_INVALIDATION", False)
 DEFAULT_RELEVANCE_INVALIDATION = getattr(settings, "DJANGO_CACHE_DEFAULT_RELEVANCE_INVALIDATION", False)
@@ -13,3 +13,43 @@ DEFAULT_RELEVANCE_EXPIRES = getattr(settings, "DJANGO_CACHE_DEFAULT_RELEVANCE_EX
 DEFAULT_DELAY_COUNTDOWN = getattr(settings, "DJANGO_CACHE_DEFAULT_DELAY_COUNTDOWN", 5)
 DEFAULT_DELAY_LOGGING = getattr(settings, "DJANGO_CACHE_DEFAULT_DELAY_LOGGING", False)
 IS_CONCURRENT = getattr(settings, "DJANGO_CACHE_IS_CONCURRENT", True)
+DEFAULT_LOCK_EXPIRES = getattr(settings, "DJANGO_CACHE_DEFAULT_LOCK_EXPIRES", 10)
+MIN_TICK_SIZE = getattr(settings, "DJANGO_CACHE_MIN_TICK_SIZE", 0.005)
+DEFAULT_STALE_WHILE_REVALIDATE = getattr(settings, "DJANGO_CACHE_DEFAULT_STALE_WHILE_REVALIDATE", False)
+REVALIDATION_WORKERS = getattr(settings, "DJANGO_CACHE_REVALIDATION_WORKERS", 4)
+DEFAULT_LOCAL_CACHE = getattr(settings, "DJANGO_CACHE_DEFAULT_LOCAL_CACHE", False)
+DEFAULT_LOCAL_CACHE_SIZE = getattr(settings, "DJANGO_CACHE_DEFAULT_LOCAL_CACHE_SIZE", 1000)
+DEFAULT_LOCAL_CACHE_BYTES = getattr(settings, "DJANGO_CACHE_DEFAULT_LOCAL_CACHE_BYTES", None)
+LOCAL_CACHE_CHECK_INTERVAL = getattr(settings, "DJANGO_CACHE_LOCAL_CACHE_CHECK_INTERVAL", 1)
+DEFAULT_BUFFER_LOGGING = getattr(settings, "DJANGO_CACHE_DEFAULT_BUFFER_LOGGING", False)
+LOG_BUFFER_SIZE = getattr(settings, "DJANGO_CACHE_LOG_BUFFER_SIZE", 500)
+LOG_BUFFER_TIMEOUT = getattr(settings, "DJANGO_CACHE_LOG_BUFFER_TIMEOUT", 1)
+LOG_BUFFER_FLUSH_ON_REQUEST_END = getattr(settings, "DJANGO_CACHE_LOG_BUFFER_FLUSH_ON_REQUEST_END", False)
+REBUILD_BATCH_SIZE = getattr(settings, "DJANGO_CACHE_REBUILD_BATCH_SIZE", 100)
+REBUILD_WORKERS = getattr(settings, "DJANGO_CACHE_REBUILD_WORKERS", 1)
+REBUILD_RATE_LIMIT = getattr(settings, "DJANGO_CACHE_REBUILD_RATE_LIMIT", None)
+DEFAULT_INVALIDATION_STRATEGY = getattr(settings, "DJANGO_CACHE_DEFAULT_INVALIDATION_STRATEGY", "rebuild")
+DEFAULT_HOT_HITS = getattr(settings, "DJANGO_CACHE_DEFAULT_HOT_HITS", 1)
+DEFAULT_GENERATIONS = getattr(settings, "DJANGO_CACHE_DEFAULT_GENERATIONS", False)
+DEFAULT_CODEC = getattr(settings, "DJANGO_CACHE_DEFAULT_CODEC", "dict")
+COMPRESS_THRESHOLD = getattr(settings, "DJANGO_CACHE_COMPRESS_THRESHOLD", 1024)
+CHUNK_SIZE = getattr(settings, "DJANGO_CACHE_CHUNK_SIZE", 512 * 1024)
+CHUNK_EXPIRES_GAP = getattr(settings, "DJANGO_CACHE_CHUNK_EXPIRES_GAP", 60)
+DEFAULT_MATERIALIZATION = getattr(settings, "DJANGO_CACHE_DEFAULT_MATERIALIZATION", "instances")
+METRICS = getattr(settings, "DJANGO_CACHE_METRICS", False)
+METRICS_OBSERVERS = getattr(settings, "DJANGO_CACHE_METRICS_OBSERVERS", ())
+METRICS_BUCKETS = getattr(
+    settings, "DJANGO_CACHE_METRICS_BUCKETS",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+METRICS_PUBLISH_INTERVAL = getattr(settings, "DJANGO_CACHE_METRICS_PUBLISH_INTERVAL", None)
+DEFAULT_EARLY_REFRESH = getattr(settings, "DJANGO_CACHE_DEFAULT_EARLY_REFRESH", False)
+DEFAULT_EARLY_REFRESH_BETA = getattr(settings, "DJANGO_CACHE_DEFAULT_EARLY_REFRESH_BETA", 1.0)
+DEFAULT_EXPIRES_JITTER = getattr(settings, "DJANGO_CACHE_DEFAULT_EXPIRES_JITTER", 0)
+RELEVANCE_SWEEP_CHUNK_SIZE = getattr(settings, "DJANGO_CACHE_RELEVANCE_SWEEP_CHUNK_SIZE", 100)
+RELEVANCE_SWEEP_LEASE = getattr(settings, "DJANGO_CACHE_RELEVANCE_SWEEP_LEASE", 60)
+RELEVANCE_SWEEP_SHARDS = getattr(settings, "DJANGO_CACHE_RELEVANCE_SWEEP_SHARDS", 1)
+AUTOMATIC_INVALIDATION_ON_COMMIT = getattr(settings, "DJANGO_CACHE_AUTOMATIC_INVALIDATION_ON_COMMIT", True)
+DEBOUNCE_INVALIDATION = getattr(settings, "DJANGO_CACHE_DEBOUNCE_INVALIDATION", True)
+DEBOUNCE_INVALIDATION_TIMEOUT = getattr(settings, "DJANGO_CACHE_DEBOUNCE_INVALIDATION_TIMEOUT", 60)
+TAGS_INDEX_EXPIRES = getattr(settings, "DJANGO_CACHE_TAGS_INDEX_EXPIRES", 24 * 60 * 60)
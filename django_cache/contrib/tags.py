@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import blake2b
+from typing import Any, Iterable, List, Optional, Set, Tuple, Union
+import time
+
+from django.core.cache import cache
+
+from . import settings as default
+
+
+TAGS_KEY = "django_cache||TAG"
+# Longer tags are hashed, so index keys fit memcached limit of 250 bytes
+MAX_TAG_LENGTH = 64
+SLOTS_SCAN_SIZE = 100
+
+Tag = Union[str, Tuple[Any, ...]]
+
+# Tags added by running structure getter
+_collected: ContextVar[Optional[List[Tag]]] = ContextVar("django_cache_tags", default=None)
+
+
+def normalize_tag(tag: Tag) -> str:
+    normalized = ":".join(map(str, tag)) if isinstance(tag, tuple) else str(tag)
+    if len(normalized) > MAX_TAG_LENGTH:
+        return "#" + blake2b(normalized.encode(), digest_size=16).hexdigest()
+    return normalized
+
+
+def get_instance_tag(instance) -> Tag:
+    return instance._meta.label, instance.pk
+
+
+def get_model_tag(model) -> Tag:
+    return model._meta.label
+
+
+def add_tags(*tags: Tag):
+    # Called inside structure getter, built value depends on tags
+    collected = _collected.get()
+    if collected is not None:
+        collected.extend(tags)
+
+
+class CollectedTags(list):
+    # Tags of value and time when its building was started
+    def __init__(self):
+        super().__init__()
+        self.since = time.time()
+
+
+@contextmanager
+def collect_tags():
+    tags = CollectedTags()
+    token = _collected.set(tags)
+    try:
+        yield tags
+    finally:
+        _collected.reset(token)
+
+
+def get_tag_key(tag: Tag) -> str:
+    return f"{TAGS_KEY}||{normalize_tag(tag)}"
+
+
+def get_next_slot(tag_key: str) -> int:
+    count_key = f"{tag_key}||COUNT"
+    try:
+        return cache.incr(count_key)
+    except ValueError:
+        # Counter is expired or evicted, numbers are continued from not read slots
+        start = cache.get(f"{tag_key}||START", 1)
+        cache.add(count_key, start - 1, default.TAGS_INDEX_EXPIRES)
+        return cache.incr(count_key)
+
+
+def find_last_slot(tag_key: str, start: int) -> int:
+    # Counter is expired or evicted, slots are read until chunk without any of them
+    last = start - 1
+    while True:
+        numbers = range(last + 1, last + 1 + SLOTS_SCAN_SIZE)
+        found = cache.get_many([f"{tag_key}||SLOT||{number}" for number in numbers])
+        if not found:
+            return last
+        last = max(int(slot_key.rsplit("||", 1)[1]) for slot_key in found)
+
+
+def register_tags(label: str, key: str, tags: CollectedTags, timeout: Optional[int]) -> bool:
+    # Tag index is append-only list of slots, atomic `incr` gives slot number,
+    # so concurrent processes never overwrite each other.
+    # Called after value is written, False means value was deleted.
+    tag_keys = {get_tag_key(tag) for tag in tags}
+    for tag_key in tag_keys:
+        # Slot is taken again if number was given before counter reset
+        while not cache.add(f"{tag_key}||SLOT||{get_next_slot(tag_key)}", (label, key), timeout):
+            pass
+    # Tag invalidated meanwhile could miss the key, so value is deleted
+    invalidated = cache.get_many([f"{tag_key}||INVALIDATED" for tag_key in tag_keys])
+    if any(invalidated_at >= tags.since for invalidated_at in invalidated.values()):
+        cache.delete(key)
+        return False
+    return True
+
+
+def pop_tagged(tags: Iterable[Tag]) -> Set[Tuple[str, str]]:
+    # Read and forget (label, key) items of tags
+    tag_keys = {get_tag_key(tag) for tag in tags}
+    # Marked before reading, so values which are registered meanwhile are deleted by registrar
+    cache.set_many(
+        {f"{tag_key}||INVALIDATED": time.time() for tag_key in tag_keys}, default.TAGS_INDEX_EXPIRES
+    )
+    tagged = set()
+    for tag_key in tag_keys:
+        bounds = cache.get_many([f"{tag_key}||COUNT", f"{tag_key}||START"])
+        count, start = bounds.get(f"{tag_key}||COUNT"), bounds.get(f"{tag_key}||START", 1)
+        if count is None:
+            count = find_last_slot(tag_key, start)
+        if start > count:
+            continue
+        slots = [f"{tag_key}||SLOT||{slot}" for slot in range(start, count + 1)]
+        tagged.update(cache.get_many(slots).values())
+        # Slots appended meanwhile are kept for next invalidation
+        cache.set(f"{tag_key}||START", count + 1, default.TAGS_INDEX_EXPIRES)
+        cache.delete_many(slots)
+    return tagged
@@ -0,0 +1,76 @@
+from typing import Iterable, Iterator, Tuple
+from operator import itemgetter
+import heapq
+
+from django.core.cache import cache
+
+from ..models import CreatedCache
+from .cache import CacheWorker, REBUILD, REBUILD_IF_HOT, get_hits_key
+from .rebuild import CacheLogItem, RebuildResult, chunked, rebuild_created_caches
+from . import settings as default
+
+
+# Warm up orders
+RECENT = "recent"
+HITS = "hits"
+
+
+def is_hits_counted(cache_worker: CacheWorker) -> bool:
+    return cache_worker.invalidation_strategy == REBUILD_IF_HOT
+
+
+def count_hits(items: Iterable[CacheLogItem], batch_size: int) -> Iterator[Tuple[int, CacheLogItem]]:
+    for chunk in chunked(items, batch_size):
+        hits = cache.get_many([get_hits_key(key) for key, _ in chunk])
+        for item in chunk:
+            yield hits.get(get_hits_key(item[0]), 0), item
+
+
+def get_warm_up_items(cache_worker: CacheWorker, order: str = RECENT, limit: int = None) -> Iterable[CacheLogItem]:
+    created_caches = CreatedCache.objects.filter(label=cache_worker.label).order_by(
+        "-created_at", "-id"
+    ).values_list("key", "attributes")
+    if order == HITS:
+        if not is_hits_counted(cache_worker):
+            raise ValueError(f"Hits are counted only with {REBUILD_IF_HOT} invalidation strategy")
+        batch_size = default.REBUILD_BATCH_SIZE
+        items = count_hits(created_caches.iterator(chunk_size=batch_size), batch_size)
+        # Logs are streamed, only `limit` hottest items are kept in memory.
+        # Recently built first for same hits.
+        if limit:
+            return [item for _, item in heapq.nlargest(limit, items, key=itemgetter(0))]
+        return [item for _, item in sorted(items, key=itemgetter(0), reverse=True)]
+    if limit:
+        created_caches = created_caches[:limit]
+    return created_caches.iterator()
+
+
+def skip_cached(items: Iterable[CacheLogItem], batch_size: int) -> Iterator[CacheLogItem]:
+    for chunk in chunked(items, batch_size):
+        cached = cache.get_many([key for key, _ in chunk])
+        yield from (item for item in chunk if item[0] not in cached)
+
+
+def warm_up(
+    cache_worker: CacheWorker,
+    *,
+    order: str = RECENT,
+    limit: int = None,
+    only_missing: bool = True,
+    batch_size: int = None,
+    workers: int = None,
+    rate_limit: float = None
+) -> RebuildResult:
+    # Build again values from logs, missed values only by default
+    batch_size = batch_size or default.REBUILD_BATCH_SIZE
+    items = get_warm_up_items(cache_worker, order, limit)
+    if only_missing:
+        items = skip_cached(items, batch_size)
+    return rebuild_created_caches(
+        cache_worker,
+        items,
+        batch_size=batch_size,
+        workers=workers,
+        rate_limit=rate_limit,
+        strategy=REBUILD
+    )
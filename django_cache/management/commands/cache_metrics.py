@@ -0,0 +1,19 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from django_cache.contrib.metrics import load_published
+
+
+class Command(BaseCommand):
+    help = "Dump cache metrics published by all processes (DJANGO_CACHE_METRICS_PUBLISH_INTERVAL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=("prometheus", "json"), default="prometheus")
+
+    def handle(self, *args, **options):
+        published = load_published()
+        if options["format"] == "json":
+            self.stdout.write(json.dumps(published.snapshot(), indent=2))
+        else:
+            self.stdout.write(published.to_prometheus(), ending="")
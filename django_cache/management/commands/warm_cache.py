@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from django_cache.contrib import workers_collection
+from django_cache.contrib.warmup import warm_up, is_hits_counted, RECENT, HITS
+from django_cache.models import CreatedCache
+
+
+class Command(BaseCommand):
+    help = "Build cache values again by CreatedCache logs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("labels", nargs="*", help="Workers labels, all logged labels by default")
+        parser.add_argument(
+            "--order", choices=(RECENT, HITS), default=RECENT,
+            help="Recently built values first or values with more hits first (rebuild_if_hot workers only)"
+        )
+        parser.add_argument("--limit", type=int, help="Max count of values per label")
+        parser.add_argument("--all", action="store_true", help="Build values which are already cached as well")
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--workers", type=int, help="Count of building threads")
+        parser.add_argument("--rate-limit", type=float, help="Max count of built values per second")
+
+    def handle(self, *args, **options):
+        labels = options["labels"] or (
+            CreatedCache.objects.order_by("label").values_list("label", flat=True).distinct()
+        )
+        for label in labels:
+            cache_worker = workers_collection.get(label)
+            if not cache_worker:
+                self.stderr.write(f"{label}: worker is not registered, skipped")
+                continue
+            if options["order"] == HITS and not is_hits_counted(cache_worker):
+                self.stderr.write(f"{label}: hits are not counted by worker, skipped")
+                continue
+            result = warm_up(
+                cache_worker,
+                order=options["order"],
+                limit=options["limit"],
+                only_missing=not options["all"],
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                rate_limit=options["rate_limit"],
+            )
+            # Warm up always builds values, nothing is deleted
+            self.stdout.write(f"{label}: {result.rebuilt} values warmed")
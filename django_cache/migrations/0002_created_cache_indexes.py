@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:20
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def delete_duplicated_keys(apps, schema_editor):
+    CreatedCache = apps.get_model("django_cache", "CreatedCache")
+    last_ids = (
+        CreatedCache.objects.values("key")
+        .annotate(last_id=Max("id"))
+        .values("last_id")
+    )
+    CreatedCache.objects.exclude(id__in=last_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_cache', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicated_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='createdcache',
+            name='key',
+            field=models.CharField(max_length=255, unique=True, verbose_name='Key'),
+        ),
+        migrations.AlterField(
+            model_name='createdcache',
+            name='label',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Label'),
+        ),
+        migrations.AddIndex(
+            model_name='createdcache',
+            index=models.Index(fields=['is_relevance_invalidation', 'relevance_to'], name='django_cache_relevance_idx'),
+        ),
+    ]
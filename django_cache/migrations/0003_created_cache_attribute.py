@@ -0,0 +1,52 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_attributes(apps, schema_editor):
+    from django_cache.contrib.attributes import normalize_attribute_value, get_attribute_values
+
+    CreatedCache = apps.get_model("django_cache", "CreatedCache")
+    CreatedCacheAttribute = apps.get_model("django_cache", "CreatedCacheAttribute")
+    attributes = []
+    for cache_log in CreatedCache.objects.all().iterator():
+        filterable_kwargs = (cache_log.attributes or {}).get("filterable_kwargs") or {}
+        for name, values in filterable_kwargs.items():
+            for value in {normalize_attribute_value(value) for value in get_attribute_values(values)}:
+                attributes.append(CreatedCacheAttribute(
+                    created_cache_id=cache_log.id, label=cache_log.label, name=name, value=value
+                ))
+        if len(attributes) >= 1000:
+            CreatedCacheAttribute.objects.bulk_create(attributes)
+            attributes = []
+    CreatedCacheAttribute.objects.bulk_create(attributes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_cache', '0002_created_cache_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreatedCacheAttribute',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=255, verbose_name='Label')),
+                ('name', models.CharField(max_length=255, verbose_name='Name')),
+                ('value', models.CharField(max_length=255, verbose_name='Value')),
+                ('created_cache', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='filterable_attributes', to='django_cache.createdcache', verbose_name='Created cache')),
+            ],
+            options={
+                'verbose_name': 'Created cache attribute',
+                'verbose_name_plural': 'Created cache attributes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='createdcacheattribute',
+            index=models.Index(fields=['label', 'name', 'value'], name='django_cache_attribute_idx'),
+        ),
+        migrations.RunPython(fill_attributes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:02
+
+from django.db import migrations
+
+
+ATTRIBUTES_INDEX = "django_cache_attributes_gin"
+
+
+def drop_attributes_index(apps, schema_editor):
+    # Attributes are filtered by CreatedCacheAttribute, index was created by previous 0002
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {ATTRIBUTES_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_cache', '0003_created_cache_attribute'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_attributes_index, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,7 @@ class CreatedCache(models.Model):
     label = models.CharField(
         verbose_name=pgettext_lazy("cache", "Label"),
         max_length=255,
+        db_index=True,
     )
     attributes = models.JSONField(
         verbose_name=pgettext_lazy("cache", "attributes")
@@ -13,6 +14,7 @@ class CreatedCache(models.Model):
     key = models.CharField(
         verbose_name=pgettext_lazy("cache", "Key"),
         max_length=255,
+        unique=True,
     )
     created_at = models.DateTimeField(
         verbose_name=pgettext_lazy("cache", "Created At"),
@@ -32,6 +34,46 @@ class CreatedCache(models.Model):
     class Meta:
         verbose_name = pgettext_lazy("cache", "Created cache")
         verbose_name_plural = pgettext_lazy("cache", "Created caches")
+        indexes = [
+            models.Index(
+                fields=["is_relevance_invalidation", "relevance_to"],
+                name="django_cache_relevance_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.label
+
+
+class CreatedCacheAttribute(models.Model):
+    created_cache = models.ForeignKey(
+        CreatedCache,
+        verbose_name=pgettext_lazy("cache", "Created cache"),
+        on_delete=models.CASCADE,
+        related_name="filterable_attributes",
+    )
+    label = models.CharField(
+        verbose_name=pgettext_lazy("cache", "Label"),
+        max_length=255,
+    )
+    name = models.CharField(
+        verbose_name=pgettext_lazy("cache", "Name"),
+        max_length=255,
+    )
+    value = models.CharField(
+        verbose_name=pgettext_lazy("cache", "Value"),
+        max_length=255,
+    )
+
+    class Meta:
+        verbose_name = pgettext_lazy("cache", "Created cache attribute")
+        verbose_name_plural = pgettext_lazy("cache", "Created cache attributes")
+        indexes = [
+            models.Index(
+                fields=["label", "name", "value"],
+                name="django_cache_attribute_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
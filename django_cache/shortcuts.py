@@ -1,6 +1,8 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List
 
-from .contrib import workers_collection, CacheWorker, invalidate, invalidate_all
+from .contrib import (
+    workers_collection, CacheWorker, invalidate, invalidate_all
+)
 
 
 def get_cache_worker(label: str) -> CacheWorker:
@@ -15,6 +17,14 @@ def save_cache(label: str, *args, **kwargs) -> Any:
     return get_cache_worker(label).save(*args, **kwargs)
 
 
+def get_cache_many(label: str, arguments: Iterable[Dict], **kwargs) -> List[Any]:
+    return get_cache_worker(label).get_many(arguments, **kwargs)
+
+
+def save_cache_many(label: str, arguments: Iterable[Dict], **kwargs) -> List[Any]:
+    return get_cache_worker(label).save_many(arguments, **kwargs)
+
+
 def clear_all(label: str):
     get_cache_worker(label).clear_all()
 
@@ -27,3 +37,23 @@ def invalidate_cache(label: str, old_data: Dict, new_data: Dict = None):
 def invalidate_all_cache(label: str):
     worker = get_cache_worker(label)
     invalidate_all(worker)
+
+
+async def aget_cache(label: str, *args, **kwargs) -> Any:
+    return await get_cache_worker(label).aget(*args, **kwargs)
+
+
+async def asave_cache(label: str, *args, **kwargs) -> Any:
+    return await get_cache_worker(label).asave(*args, **kwargs)
+
+
+async def aget_cache_many(label: str, arguments: Iterable[Dict], **kwargs) -> List[Any]:
+    return await get_cache_worker(label).aget_many(arguments, **kwargs)
+
+
+async def ainvalidate_cache(label: str, old_data: Dict, new_data: Dict = None):
+    await get_cache_worker(label).ainvalidate(old_data, new_data)
+
+
+async def ainvalidate_all_cache(label: str):
+    await get_cache_worker(label).ainvalidate_all()
@@ -1,7 +1,10 @@
 from celery import shared_task
+from django.core.cache import cache
 
-from .contrib.invalidation import INVALIDATION_PROCESSES, lazy_invalidation, invalidate_by_relevance_expires
+from .contrib.invalidation import INVALIDATION_PROCESSES, invalidate_by_relevance_expires
 from .contrib.registration import workers_collection
+from .contrib.revalidation import revalidate_key
+from .contrib import settings as default
 
 
 @shared_task(default_retry_delay=1, max_retries=15)
@@ -11,16 +14,33 @@ def run_invalidate_task(invalidation_type, worker_label, *args, **kwargs):
 
 
 @shared_task(default_retry_delay=1, max_retries=15)
-def create_cache_log_task(key, timeout, label, is_timeout_invalidation, *args, **kwargs):
+def run_debounced_invalidate_task(debounce_key, invalidation_type, worker_label, *args, **kwargs):
+    # Changes made after start must enqueue new invalidation
+    cache.delete(debounce_key)
+    run_invalidate_task(invalidation_type, worker_label, *args, **kwargs)
+
+
+@shared_task(default_retry_delay=1, max_retries=15)
+def create_cache_log_task(label, key, is_relevance_invalidation, available_to, relevance_to, *args, **kwargs):
     from .contrib.save import log_cache_value
-    log_cache_value(key, timeout, label, is_timeout_invalidation, *args, **kwargs)
+    log_cache_value(label, key, is_relevance_invalidation, available_to, relevance_to, *args, **kwargs)
 
 
 @shared_task(default_retry_delay=5, max_retries=5)
 def lazy_invalidation_task(key):
-    lazy_invalidation(key)
+    revalidate_key(key)
 
 
 @shared_task(default_retry_delay=1, max_retries=1)
 def relevance_invalidation_task():
-    invalidate_by_relevance_expires()
+    shards = default.RELEVANCE_SWEEP_SHARDS
+    if shards <= 1:
+        return invalidate_by_relevance_expires()
+    # Fan out sweeping across celery workers
+    for shard in range(shards):
+        relevance_sweep_task.delay(shard, shards)
+
+
+@shared_task(default_retry_delay=1, max_retries=1)
+def relevance_sweep_task(shard, shards):
+    return invalidate_by_relevance_expires(shard=shard, shards=shards)
@@ -1,21 +1,61 @@
+import json
 import time
+import pickle
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from asgiref.sync import async_to_sync, sync_to_async
+from kombu.utils.json import dumps as json_dumps, loads as json_loads
+
+from django.test import TestCase, TransactionTestCase
 from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.core.management import call_command
 
 from django_cache.shortcuts import (
     get_cache_worker, get_cache, save_cache,
-    invalidate_cache, invalidate_all_cache
+    get_cache_many, save_cache_many, clear_all,
+    invalidate_cache, invalidate_all_cache,
+    aget_cache, aget_cache_many, ainvalidate_cache
+)
+from django_cache.contrib.invalidation import (
+    invalidate, invalidate_all, invalidate_tags, get_created_cache, claim_relevance_expired, invalidate_by_relevance_expires,
+    invalidate_process, invalidate_many_process, INVALIDATE, INVALIDATE_ALL, INVALIDATE_MANY
+)
+from django_cache.contrib.lock import SingleFlightLock, get_precache_key, _waiters as lock_waiters
+from django_cache.contrib.cache import CacheWorker, DELETE, get_hits_key
+from django_cache.contrib.keygen import keygen, typed_keygen, hashed_keygen, TypedKeygen
+from django_cache.contrib.codecs import (
+    CODECS, ChunkedCodec, decode, expire_chunks, get_chunk_key, CHUNKED_ENVELOPE, ZLIB_MARKER
+)
+from django_cache.contrib.materialization import IDS, VALUES, VALUES_LIST, ModelIds
+from django_cache.contrib.save import CachedEntity, log_buffer, flush_cache_logs, log_cache_value
+from django_cache.contrib.revalidation import revalidate_key
+from django_cache.contrib.local import bump_version
+from django_cache.contrib.metrics import (
+    MetricsCollector, observers, collector, send_signal, cache_event, HIT, MISS, INVALIDATION
+)
+from django_cache.contrib.tags import get_tag_key
+from django_cache.contrib.delta import (
+    DeltaNotApplicable, filtered_instances_delta, patch_value,
+    CREATE as DELTA_CREATE, UPDATE as DELTA_UPDATE, DELETE as DELTA_DELETE
+)
+from django_cache.contrib.rebuild import RebuildResult, rebuild_created_caches, rate_limited
+from django_cache.contrib.warmup import get_warm_up_items, HITS
+from django_cache.models import CreatedCache, CreatedCacheAttribute
+from django_cache.tasks import (
+    run_invalidate_task, run_debounced_invalidate_task, relevance_invalidation_task, create_cache_log_task
 )
-from django_cache.contrib.invalidation import invalidate, INVALIDATE, INVALIDATE_ALL
-from django_cache.models import CreatedCache
-from django_cache.tasks import run_invalidate_task, relevance_invalidation_task
 from django_cache.admin import invalidate_action
 
 from example_apps.foo.models import Foo, Bar
 from example_apps.foo.cache import (
     simple_foo, simple_bar, fast_foo_cache, fast_foo_timeout_cache,
-    nested_foo_cache
+    nested_foo_cache, local_foo_cache, hot_foo_cache, tagged_foo_cache, delta_bar_cache
 )
 
 
@@ -112,17 +152,22 @@ class GeneralTestCase(TestCase):
         cache.clear()
 
     def test_auto_invalidation(self):
-        foo1 = Foo.objects.create(attr1=1, attr2="test", attr3=1.1)
-        bar = Bar.objects.create(attr1=1, attr2="test", attr3=1.1, foo=foo1)
+        with self.captureOnCommitCallbacks(execute=True):
+            foo1 = Foo.objects.create(attr1=1, attr2="test", attr3=1.1)
+            bar = Bar.objects.create(attr1=1, attr2="test", attr3=1.1, foo=foo1)
         self.assertIn(bar, simple_bar.get(attr1=1, attr2="test", attr3=1.1))
-        bar2 = Bar.objects.create(attr1=1, attr2="test", attr3=1.1, foo=foo1)
+        with self.captureOnCommitCallbacks(execute=True):
+            bar2 = Bar.objects.create(attr1=1, attr2="test", attr3=1.1, foo=foo1)
         self.assertIn(bar2, simple_bar.get(attr1=1, attr2="test", attr3=1.1))
-        bar3 = Bar.objects.create(attr1=2, attr2="test", attr3=1.1, foo=foo1)
+        with self.captureOnCommitCallbacks(execute=True):
+            bar3 = Bar.objects.create(attr1=2, attr2="test", attr3=1.1, foo=foo1)
         self.assertNotIn(bar3, simple_bar.get(attr1=1, attr2="test", attr3=1.1))
         bar3.attr1 = 1
-        bar3.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            bar3.save()
         self.assertIn(bar3, simple_bar.get(attr1=1, attr2="test", attr3=1.1))
-        bar3.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            bar3.delete()
         self.assertNotIn(bar3, simple_bar.get(attr1=1, attr2="test", attr3=1.1))
         cache.clear()
 
@@ -158,6 +203,28 @@ class GeneralTestCase(TestCase):
         self.assertIn(foo3, simple_foo.get(**kwargs))
         cache.clear()
 
+    def test_debounced_invalidation(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        self.assertIn(foo1, simple_foo.get(**kwargs))
+        foo2 = Foo.objects.create(**kwargs)
+        with mock.patch("django_cache.tasks.run_debounced_invalidate_task.apply_async") as apply_async:
+            for _ in range(3):
+                invalidate(simple_foo, kwargs, is_delay=True)
+            invalidate(simple_foo, {**kwargs, "attr1": 2}, is_delay=True)
+            self.assertEqual(apply_async.call_count, 2)
+            task_args = apply_async.call_args_list[0].kwargs["args"]
+            self.assertNotIn(foo2, simple_foo.get(**kwargs))
+            run_debounced_invalidate_task(*task_args)
+            self.assertIn(foo2, simple_foo.get(**kwargs))
+            # Token is released by started task
+            invalidate(simple_foo, kwargs, is_delay=True)
+            self.assertEqual(apply_async.call_count, 3)
+            invalidate_all(simple_foo, is_delay=True)
+            invalidate(simple_foo, {**kwargs, "attr1": 3}, is_delay=True)
+            self.assertEqual(apply_async.call_count, 4)
+        cache.clear()
+
     def test_same_cache_object_cleaning(self):
         kwargs = dict(attr1=1, attr2="test", attr3=1.1)
         kwargs2 = dict(attr1=2, attr2="test2", attr3=2.1)
@@ -170,8 +237,10 @@ class GeneralTestCase(TestCase):
         self.assertEqual(CreatedCache.objects.count(), 2)
         foo3 = Foo.objects.create(**kwargs)
         self.assertIn(foo3, simple_foo.save(**kwargs))
-        self.assertFalse(CreatedCache.objects.filter(id=c_object1.id).exists())
-        self.assertTrue(CreatedCache.objects.filter(id=c_object2.id).exists())
+        # Log of same key is replaced in place
+        self.assertEqual(CreatedCache.objects.count(), 2)
+        self.assertGreater(CreatedCache.objects.get(key=c_object1.key).created_at, c_object1.created_at)
+        self.assertEqual(CreatedCache.objects.get(key=c_object2.key).created_at, c_object2.created_at)
         cache.clear()
 
     def test_lazy_invalidation(self):
@@ -195,22 +264,193 @@ class GeneralTestCase(TestCase):
         self.assertIn(foo2, cache.get(key).get("value"))
         cache.clear()
 
+    def test_relevance_sweep(self):
+        arguments = [dict(attr1=i, attr2="test", attr3=1.1) for i in range(5)]
+        for kwargs in arguments:
+            Foo.objects.create(**kwargs)
+            fast_foo_timeout_cache.get(**kwargs)
+        past = datetime.now() - timedelta(seconds=10)
+        CreatedCache.objects.update(relevance_to=past)
+        # Shards are disjoint, claimed rows are leased
+        claimed = [claim_relevance_expired(10, 60, shard, 2) for shard in range(2)]
+        self.assertEqual(len(claimed[0]) + len(claimed[1]), 5)
+        self.assertFalse({key for _, key, _ in claimed[0]} & {key for _, key, _ in claimed[1]})
+        self.assertEqual(claim_relevance_expired(10, 60), [])
+        self.assertFalse(CreatedCache.objects.filter(relevance_to__lte=datetime.now()).exists())
+        CreatedCache.objects.update(relevance_to=past)
+        foo = Foo.objects.create(**arguments[0])
+        self.assertEqual(invalidate_by_relevance_expires(chunk_size=2), 5)
+        self.assertIn(foo, cache.get(fast_foo_timeout_cache.get_key(**arguments[0]))["value"])
+        self.assertEqual(invalidate_by_relevance_expires(), 0)
+        cache.clear()
+
+    def test_coalesced_invalidation(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        with self.captureOnCommitCallbacks(execute=True):
+            foo1 = Foo.objects.create(**kwargs)
+            bars = [Bar.objects.create(foo=foo1, **kwargs) for _ in range(3)]
+        self.assertEqual(len(simple_bar.get(**kwargs)), 3)
+        processes = {INVALIDATE: invalidate_process, INVALIDATE_MANY: invalidate_many_process}
+        with mock.patch.dict("django_cache.contrib.invalidation.INVALIDATION_PROCESSES", {
+            name: mock.Mock(wraps=process) for name, process in processes.items()
+        }) as invalidation_processes:
+            with self.captureOnCommitCallbacks(execute=True):
+                Bar.objects.filter(id__in=[bar.id for bar in bars[:2]]).update(attr1=2)
+                bars[2].attr1 = 2
+                bars[2].save()
+                # Waits for commit
+                self.assertEqual(len(simple_bar.get(**kwargs)), 3)
+            # One invalidation by worker
+            self.assertEqual(
+                sorted(call.args[0].label for call in invalidation_processes[INVALIDATE].call_args_list),
+                ["delta_bar_cache", "nested_foo_cache", "simple_bar"]
+            )
+            self.assertEqual(len(simple_bar.get(**kwargs)), 0)
+            self.assertEqual(len(simple_bar.get(**{**kwargs, "attr1": 2})), 3)
+            self.assertEqual(len(simple_bar.get(**{**kwargs, "attr1": 3})), 0)
+            with self.captureOnCommitCallbacks(execute=True):
+                Bar.objects.create(foo=foo1, **{**kwargs, "attr1": 3})
+                Bar.objects.create(foo=foo1, **{**kwargs, "attr1": 4})
+            self.assertEqual(
+                sorted(call.args[0].label for call in invalidation_processes[INVALIDATE_MANY].call_args_list),
+                ["nested_foo_cache", "simple_bar"]
+            )
+        self.assertEqual(len(simple_bar.get(**{**kwargs, "attr1": 3})), 1)
+        # Scheduling of rolled back savepoint is reset
+        self.assertEqual(len(simple_bar.get(**{**kwargs, "attr1": 2})), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Bar.objects.create(foo=foo1, **{**kwargs, "attr1": 2})
+                raise RuntimeError
+            Bar.objects.create(foo=foo1, **{**kwargs, "attr1": 2})
+        self.assertEqual(len(simple_bar.get(**{**kwargs, "attr1": 2})), 4)
+        cache.clear()
+
+    def test_tags_invalidation(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        with self.captureOnCommitCallbacks(execute=True):
+            foo1 = Foo.objects.create(**kwargs)
+            foo2 = Foo.objects.create(**kwargs)
+            bar1 = Bar.objects.create(foo=foo1, **kwargs)
+            bar2 = Bar.objects.create(foo=foo1, **kwargs)
+        self.assertEqual(list(tagged_foo_cache.get(attr1=1, bars=[bar1.id])), [foo1])
+        self.assertEqual(list(tagged_foo_cache.get(attr1=1, bars=[bar2.id])), [foo1])
+        key1 = tagged_foo_cache.get_key(attr1=1, bars=[bar1.id])
+        key2 = tagged_foo_cache.get_key(attr1=1, bars=[bar2.id])
+        bar2.foo = foo2
+        with self.captureOnCommitCallbacks(execute=True):
+            bar2.save()
+        # Only dependent value is deleted
+        self.assertIsNotNone(cache.get(key1))
+        self.assertIsNone(cache.get(key2))
+        self.assertEqual(list(tagged_foo_cache.get(attr1=1, bars=[bar2.id])), [foo2])
+        # Index is released by invalidation and filled by rebuilding
+        self.assertEqual(invalidate_tags(("foo.Bar", bar1.id), ("foo.Bar", bar1.id)), 1)
+        self.assertEqual(invalidate_tags(("foo.Bar", bar1.id)), 0)
+        self.assertIsNone(cache.get(key1))
+        with self.captureOnCommitCallbacks(execute=True):
+            Bar.objects.filter(id=bar2.id).update(attr2="changed")
+        self.assertIsNone(cache.get(key2))
+        self.assertEqual(list(tagged_foo_cache.get(attr1=1, bars=[bar1.id])), [foo1])
+        # Not committed change, so value is rebuilt only by manual invalidation
+        Bar.objects.filter(id=bar1.id).update(foo=foo2)
+        with mock.patch.object(tagged_foo_cache, "invalidation_strategy", "rebuild"):
+            self.assertEqual(invalidate_tags(("foo.Bar", bar1.id)), 1)
+        self.assertEqual(list(cache.get(key1)["value"]), [foo2])
+        # Value built before concurrent invalidation of its tag is deleted after registration
+        get_foos = tagged_foo_cache.structure_getter
+
+        def get_during_invalidation(**kwargs):
+            value = get_foos(**kwargs)
+            invalidate_tags(("foo.Bar", bar1.id))
+            return value
+
+        cache.clear()
+        with mock.patch.object(tagged_foo_cache, "structure_getter", get_during_invalidation):
+            self.assertEqual(list(tagged_foo_cache.get(attr1=1, bars=[bar1.id])), [foo2])
+        self.assertIsNone(cache.get(key1))
+        # Lost counter doesn't lose registered keys
+        tag_key = get_tag_key(("foo.Bar", bar1.id))
+        self.assertEqual(list(tagged_foo_cache.get(attr1=1, bars=[bar1.id])), [foo2])
+        cache.delete(f"{tag_key}||COUNT")
+        self.assertEqual(invalidate_tags(("foo.Bar", bar1.id)), 1)
+        self.assertEqual(list(tagged_foo_cache.get(attr1=1, bars=[bar1.id])), [foo2])
+        cache.delete(f"{tag_key}||COUNT")
+        self.assertEqual(list(tagged_foo_cache.get(attr1=1, bars=[bar1.id, bar2.id])), [foo2])
+        self.assertEqual(invalidate_tags(("foo.Bar", bar1.id)), 2)
+        # Index keys fit memcached limit
+        self.assertLessEqual(len(get_tag_key("x" * 1000) + "||SLOT||" + "9" * 20), 250)
+        cache.clear()
+
+    def test_delta_updates(self):
+        kwargs = dict(attr1=1, attr2="test")
+        with self.captureOnCommitCallbacks(execute=True):
+            foo1 = Foo.objects.create(**kwargs)
+            bar1 = Bar.objects.create(foo=foo1, **kwargs)
+            bar2 = Bar.objects.create(foo=foo1, attr1=2, attr2="test")
+        self.assertEqual(list(delta_bar_cache.get(**kwargs)), [bar1])
+        self.assertEqual(list(delta_bar_cache.get(attr1=2, attr2="test")), [bar2])
+        with self.captureOnCommitCallbacks(execute=True):
+            bar3 = Bar.objects.create(foo=foo1, **kwargs)
+            Bar.objects.create(foo=foo1, attr1=3, attr2="test")
+        with mock.patch.object(delta_bar_cache, "structure_getter") as structure_getter:
+            # Patched without database queries
+            value = delta_bar_cache.get(**kwargs)
+            # Container type is kept
+            self.assertIsInstance(value, QuerySet)
+            self.assertEqual(list(value), [bar1, bar3])
+            self.assertEqual(list(delta_bar_cache.get(attr1=2, attr2="test")), [bar2])
+            bar1.attr1 = 2
+            with self.captureOnCommitCallbacks(execute=True):
+                bar1.save()
+            self.assertEqual(list(delta_bar_cache.get(**kwargs)), [bar3])
+            self.assertEqual(list(delta_bar_cache.get(attr1=2, attr2="test")), [bar2, bar1])
+            with self.captureOnCommitCallbacks(execute=True):
+                bar3.delete()
+                Bar.objects.filter(id=bar2.id).delete()
+            self.assertEqual(list(cache.get(delta_bar_cache.get_key(**kwargs))["value"]), [])
+            self.assertEqual(list(delta_bar_cache.get(attr1=2, attr2="test")), [bar1])
+            structure_getter.assert_not_called()
+        # Lookups in arguments can't be checked, value must be rebuilt
+        key = delta_bar_cache.get_key(attr1__in=[2], attr2="test")
+        self.assertEqual(list(delta_bar_cache.get(attr1__in=[2], attr2="test")), [bar1])
+        self.assertFalse(patch_value(delta_bar_cache, key, {"attr1__in": [2]}, [(bar1, DELTA_UPDATE)]))
+        # Foreign key is compared by its column
+        self.assertEqual(filtered_instances_delta([bar1], bar1, DELTA_UPDATE, {"foo": foo1.id, "attr1": 2}), [bar1])
+        self.assertEqual(filtered_instances_delta([bar1], bar1, DELTA_UPDATE, {"foo": foo1, "attr1": 2}), [bar1])
+        self.assertEqual(filtered_instances_delta([bar1], bar1, DELTA_UPDATE, {"foo_id": foo1.id + 1}), [])
+        for name in ("pk", "foo__attr1"):
+            with self.assertRaises(DeltaNotApplicable):
+                filtered_instances_delta([bar1], bar1, DELTA_UPDATE, {name: 1})
+        # Position in ordered queryset is unknown, removing is patched
+        ordered = Bar.objects.filter(attr1=2).order_by("-id")
+        bar4 = Bar.objects.create(foo=foo1, attr1=2, attr2="test")
+        with self.assertRaises(DeltaNotApplicable):
+            filtered_instances_delta(ordered.all(), bar4, DELTA_CREATE, {"attr1": 2})
+        with self.assertNumQueries(1):
+            patched = filtered_instances_delta(ordered.all(), bar4, DELTA_DELETE, {"attr1": 2})
+            self.assertEqual(list(pickle.loads(pickle.dumps(patched))), [bar1])
+        cache.clear()
+
     def test_nested_cache(self):
         kwargs = dict(attr1=1, attr2="test", attr3=1.1)
-        foo1 = Foo.objects.create(**kwargs)
-        foo2 = Foo.objects.create(**kwargs)
-        bar1 = Bar.objects.create(foo=foo1, **kwargs)
-        bar2 = Bar.objects.create(foo=foo1, **kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            foo1 = Foo.objects.create(**kwargs)
+            foo2 = Foo.objects.create(**kwargs)
+            bar1 = Bar.objects.create(foo=foo1, **kwargs)
+            bar2 = Bar.objects.create(foo=foo1, **kwargs)
         self.assertIn(foo1, nested_foo_cache.get(attr1=1, bars=[bar1.id, bar2.id]))
         self.assertIn(foo1, nested_foo_cache.get(attr1=1, bars=[bar1.id]))
         bar2.foo = foo2
-        bar2.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            bar2.save()
         self.assertNotIn(foo1, nested_foo_cache.get(attr1=1, bars=[bar2.id]))
         self.assertIn(foo2, nested_foo_cache.get(attr1=1, bars=[bar2.id]))
         self.assertIn(foo1, nested_foo_cache.get(attr1=1, bars=[bar1.id, bar2.id]))
         self.assertIn(foo2, nested_foo_cache.get(attr1=1, bars=[bar1.id, bar2.id]))
         bar2.foo = foo1
-        bar2.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            bar2.save()
         self.assertIn(foo1, nested_foo_cache.get(attr1=1, bars=[bar2.id]))
         self.assertNotIn(foo2, nested_foo_cache.get(attr1=1, bars=[bar2.id]))
         self.assertIn(foo1, nested_foo_cache.get(attr1=1, bars=[bar1.id, bar2.id]))
@@ -219,10 +459,12 @@ class GeneralTestCase(TestCase):
 
     def test_empty_attributes_cache(self):
         kwargs = dict(attr1=1, attr2="test", attr3=1.1)
-        foo1 = Foo.objects.create(**kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            foo1 = Foo.objects.create(**kwargs)
         # Registered in settings
         self.assertIn(foo1, get_cache("all_foos", relevance_invalidation=True))
-        foo2 = Foo.objects.create(**kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            foo2 = Foo.objects.create(**kwargs)
         self.assertIn(foo2, get_cache("all_foos"))
         cache.clear()
 
@@ -242,3 +484,680 @@ class GeneralTestCase(TestCase):
         self.assertIn(foo3, fast_foo_cache.get(relevance_invalidation=True, **kwargs))
         self.assertIn(foo2, fast_foo_cache.get(relevance_invalidation=True, **kwargs))
         cache.clear()
+
+    def test_concurrent_getting_waits_for_lock_owner(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        key = simple_foo.get_key(**kwargs)
+        owner = SingleFlightLock(key, 10)
+        self.assertTrue(owner.acquire())
+        self.assertFalse(SingleFlightLock(key, 10).acquire())
+        now = datetime.now()
+        entity = CachedEntity(
+            label=simple_foo.label, key=key, expires=20, is_relevance_invalidation=False,
+            created_at=now, relevance_to=now, available_to=now, value=["built"]
+        )
+
+        def build():
+            time.sleep(0.05)
+            cache.set(key, entity.to_cache(), 20)
+            owner.release()
+
+        thread = threading.Thread(target=build)
+        started = time.monotonic()
+        thread.start()
+        self.assertEqual(simple_foo.get(**kwargs), ["built"])
+        thread.join()
+        self.assertLess(time.monotonic() - started, simple_foo.tick * simple_foo.tick_amount)
+        # Value was not rebuilt by waiter
+        self.assertFalse(CreatedCache.objects.exists())
+        self.assertTrue(SingleFlightLock(key, 10).acquire())
+        cache.clear()
+        # Lock released by other process doesn't leave waiter of key
+        owner = SingleFlightLock(key, 10)
+        self.assertTrue(owner.acquire())
+
+        def build_in_other_process():
+            time.sleep(0.05)
+            cache.set(key, entity.to_cache(), 20)
+            cache.delete(owner.key)
+
+        thread = threading.Thread(target=build_in_other_process)
+        thread.start()
+        self.assertEqual(simple_foo.get(**kwargs), ["built"])
+        thread.join()
+        self.assertNotIn(owner.key, lock_waiters)
+        cache.clear()
+
+    def test_waiting_for_long_building(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        key = simple_foo.get_key(**kwargs)
+        owner = SingleFlightLock(key, 10)
+        self.assertTrue(owner.acquire())
+        now = datetime.now()
+        entity = CachedEntity(
+            label=simple_foo.label, key=key, expires=20, is_relevance_invalidation=False,
+            created_at=now, relevance_to=now, available_to=now, value=["built"]
+        )
+
+        def build():
+            time.sleep(0.1)
+            cache.set(key, entity.to_cache(), 20)
+            owner.release()
+
+        thread = threading.Thread(target=build)
+        with mock.patch.object(simple_foo, "tick", 0.01), mock.patch.object(simple_foo, "tick_amount", 2):
+            thread.start()
+            # Building takes longer than ticks, but lock is still held
+            self.assertEqual(simple_foo.get(**kwargs), ["built"])
+            thread.join()
+        self.assertFalse(CreatedCache.objects.exists())
+        cache.clear()
+        # Value saved between missed getting and lock claiming is not rebuilt
+        get = cache.get
+        cache.set(key, entity.to_cache(), 20)
+        missed = []
+
+        def get_once_missed(name, *args):
+            if name == key and not missed:
+                missed.append(name)
+                return None
+            return get(name, *args)
+
+        with mock.patch.object(cache, "get", side_effect=get_once_missed):
+            self.assertEqual(simple_foo.get(**kwargs), ["built"])
+        self.assertEqual(missed, [key])
+        self.assertFalse(CreatedCache.objects.exists())
+        self.assertIsNone(cache.get(get_precache_key(key)))
+        cache.clear()
+
+    def test_stale_while_revalidate(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        fast_foo_cache.save(relevance_invalidation=True, relevance_expires=0, **kwargs)
+        foo2 = Foo.objects.create(**kwargs)
+        executor = mock.Mock()
+        with mock.patch("django_cache.contrib.revalidation.get_executor", return_value=executor):
+            # Stale value returned, refresh scheduled only once
+            for _ in range(3):
+                result = fast_foo_cache.get(relevance_invalidation=True, stale_while_revalidate=True, **kwargs)
+                self.assertIn(foo1, result)
+                self.assertNotIn(foo2, result)
+        self.assertEqual(executor.submit.call_count, 1)
+        revalidate_key(fast_foo_cache.get_key(**kwargs))
+        self.assertIn(foo2, fast_foo_cache.get(**kwargs))
+        cache.clear()
+
+    def test_local_cache(self):
+        local_foo_cache.clear_local()
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        key = local_foo_cache.get_key(**kwargs)
+        self.assertIn(foo1, local_foo_cache.get(**kwargs))
+        # Served from process memory without shared cache
+        cache.delete(key)
+        self.assertIn(foo1, local_foo_cache.get(**kwargs))
+        foo2 = Foo.objects.create(**kwargs)
+        self.assertNotIn(foo2, local_foo_cache.get(**kwargs))
+        invalidate(local_foo_cache, kwargs)
+        self.assertIn(foo2, local_foo_cache.get(**kwargs))
+        # Bounded by entries count
+        local_foo_cache.get(attr1=2, attr2="test", attr3=None)
+        local_foo_cache.get(attr1=3, attr2="test", attr3=None)
+        self.assertIsNone(local_foo_cache.local_cache.get(key))
+        cache.clear()
+
+    def test_local_cache_invalidated_by_other_process(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        local_foo_cache.clear_local()
+        local_foo_cache.local_cache.check_interval = 0
+        foo1 = Foo.objects.create(**kwargs)
+        self.assertIn(foo1, local_foo_cache.get(**kwargs))
+        foo2 = Foo.objects.create(**kwargs)
+        local_foo_cache.save(**kwargs)
+        local_foo_cache.local_cache.set(
+            local_foo_cache.get_key(**kwargs),
+            CachedEntity(**{**cache.get(local_foo_cache.get_key(**kwargs)), "value": [foo1]})
+        )
+        self.assertNotIn(foo2, local_foo_cache.get(**kwargs))
+        bump_version(local_foo_cache.label)
+        self.assertIn(foo2, local_foo_cache.get(**kwargs))
+        local_foo_cache.local_cache.check_interval = 1
+        cache.clear()
+
+    def test_get_many(self):
+        foo1, foo2, foo3 = self._setup_testing_data()
+        arguments = [
+            dict(attr1=foo.attr1, attr2=foo.attr2, attr3=foo.attr3)
+            for foo in (foo1, foo2, foo3)
+        ]
+        simple_foo.save(**arguments[0])
+        result = get_cache_many("simple_foo", arguments)
+        self.assertEqual([list(item) for item in result], [[foo1], [foo2], [foo3]])
+        self.assertEqual(CreatedCache.objects.filter(label="simple_foo").count(), 3)
+        for item in arguments:
+            self.assertTrue(cache.get(simple_foo.get_key(**item)))
+        foo4 = Foo.objects.create(**arguments[1])
+        self.assertNotIn(foo4, simple_foo.get_many(arguments)[1])
+        self.assertIn(foo4, save_cache_many("simple_foo", arguments[1:])[0])
+        self.assertIn(foo4, simple_foo.get(**arguments[1]))
+        cache.clear()
+
+    def test_get_many_waits_for_lock_owner(self):
+        foo1, foo2, foo3 = self._setup_testing_data()
+        arguments = [
+            dict(attr1=foo.attr1, attr2=foo.attr2, attr3=foo.attr3)
+            for foo in (foo1, foo2, foo3)
+        ]
+        key = simple_foo.get_key(**arguments[1])
+        owner = SingleFlightLock(key, 10)
+        self.assertTrue(owner.acquire())
+        now = datetime.now()
+        entity = CachedEntity(
+            label=simple_foo.label, key=key, expires=20, is_relevance_invalidation=False,
+            created_at=now, relevance_to=now, available_to=now, value=["built"]
+        )
+        locks = []
+
+        def build():
+            time.sleep(0.05)
+            cache.set(key, entity.to_cache(), 20)
+            # Lock of owner is not released by batch
+            locks.append(cache.get(get_precache_key(key)))
+            owner.release()
+
+        thread = threading.Thread(target=build)
+        thread.start()
+        result = simple_foo.get_many(arguments)
+        thread.join()
+        self.assertEqual([list(item) for item in result], [[foo1], ["built"], [foo3]])
+        self.assertEqual(locks, [owner.token])
+        self.assertEqual(CreatedCache.objects.filter(label="simple_foo").count(), 2)
+        cache.clear()
+
+    def test_buffer_logging(self):
+        foo1, foo2, foo3 = self._setup_testing_data()
+        kwargs1 = dict(attr1=foo1.attr1, attr2=foo1.attr2, attr3=foo1.attr3)
+        kwargs2 = dict(attr1=foo2.attr1, attr2=foo2.attr2, attr3=foo2.attr3)
+        simple_foo.get(buffer_logging=True, **kwargs1)
+        simple_foo.save(buffer_logging=True, **kwargs1)
+        simple_foo.get_many([kwargs2], buffer_logging=True)
+        self.assertFalse(CreatedCache.objects.exists())
+        self.assertEqual(flush_cache_logs(), 2)
+        self.assertEqual(CreatedCache.objects.count(), 2)
+        # Buffered logs flushed before invalidation
+        Foo.objects.create(**kwargs2)
+        simple_foo.save(buffer_logging=True, **kwargs2)
+        foo5 = Foo.objects.create(**kwargs2)
+        invalidate(simple_foo, kwargs2)
+        self.assertIn(foo5, simple_foo.get(**kwargs2))
+        self.assertEqual(CreatedCache.objects.count(), 2)
+        self.assertFalse(log_buffer.records)
+        # Positional arguments are logged with buffer as well
+        worker = CacheWorker(
+            structure_getter=simple_foo.structure_getter,
+            label="typed_foo",
+            expires=10,
+            key_gen="typed",
+            is_register=False
+        )
+        self.assertIn(foo3, worker.get(foo3.attr1, foo3.attr2, buffer_logging=True, attr3=None))
+        self.assertEqual(flush_cache_logs(), 1)
+        cache_log = CreatedCache.objects.get(label="typed_foo")
+        self.assertEqual(cache_log.attributes["args"], [foo3.attr1, foo3.attr2])
+        cache.clear()
+
+    def test_delay_logging(self):
+        foo1, foo2, foo3 = self._setup_testing_data()
+        kwargs1 = dict(attr1=foo1.attr1, attr2=foo1.attr2, attr3=foo1.attr3)
+        kwargs2 = dict(attr1=foo2.attr1, attr2=foo2.attr2, attr3=foo2.attr3)
+        kwargs3 = dict(attr1=foo3.attr1, attr2=foo3.attr2)
+
+        def run_task(*args, **kwargs):
+            # Arguments are passed to worker by json
+            args, kwargs = json_loads(json_dumps([args, kwargs]))
+            return create_cache_log_task.apply(args, kwargs).get()
+
+        with mock.patch.object(create_cache_log_task, "delay", side_effect=run_task) as delay:
+            simple_foo.get(delay_logging=True, **kwargs1)
+            simple_foo.save_many([kwargs2, kwargs3], delay_logging=True)
+        self.assertEqual(delay.call_count, 3)
+        self.assertEqual(
+            sorted(CreatedCache.objects.values_list("attributes__kwargs__attr1", flat=True)), [1, 2, 3]
+        )
+        cache.clear()
+
+    def test_cache_log_upsert(self):
+        now = datetime.now()
+        logged = log_cache_value("simple_foo", "simple_foo@key", False, now, now, attr1=1)
+        upserted = log_cache_value("simple_foo", "simple_foo@key", True, now, now, attr1=2)
+        self.assertEqual(CreatedCache.objects.count(), 1)
+        cache_log = CreatedCache.objects.get()
+        # Logged key keeps its row
+        self.assertEqual([logged.id, upserted.id], [cache_log.id, cache_log.id])
+        self.assertTrue(cache_log.is_relevance_invalidation)
+        self.assertEqual(cache_log.attributes["kwargs"], {"attr1": 2})
+        constraints = connection.introspection.get_constraints(
+            connection.cursor(), CreatedCache._meta.db_table
+        )
+        self.assertIn("django_cache_relevance_idx", constraints)
+        self.assertNotIn("django_cache_attributes_gin", constraints)
+        # Attribute rows are rewritten only when attributes are changed
+        self.assertEqual(list(cache_log.filterable_attributes.values_list("name", "value")), [("attr1", "2")])
+        attribute_ids = list(CreatedCacheAttribute.objects.values_list("id", flat=True))
+        log_cache_value("simple_foo", "simple_foo@key", False, now, now, attr1=[2])
+        self.assertEqual(list(CreatedCacheAttribute.objects.values_list("id", flat=True)), attribute_ids)
+
+    def test_created_cache_lookup_by_many_attributes(self):
+        now = datetime.now()
+        attributes = {f"attr{index}": index for index in range(8)}
+        log_cache_value("many", "many@1", False, now, now, **attributes)
+        log_cache_value("many", "many@2", False, now, now, **{**attributes, "attr0": [0, 100]})
+        log_cache_value("many", "many@3", False, now, now, **{**attributes, "attr0": None})
+        log_cache_value("many", "many@4", False, now, now, **{**attributes, "attr7": 8})
+        log_cache_value("other", "other@1", False, now, now, **attributes)
+        self.assertEqual(
+            set(get_created_cache("many", attributes).values_list("key", flat=True)),
+            {"many@1", "many@2", "many@3"}
+        )
+        self.assertEqual(
+            set(get_created_cache("many", attributes, {**attributes, "attr7": 8.0}).values_list("key", flat=True)),
+            {"many@1", "many@2", "many@3", "many@4"}
+        )
+        self.assertFalse(get_created_cache("many", attributes, attributes).exists())
+
+    def test_delete_invalidation_strategy(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        key = simple_foo.get_key(**kwargs)
+        self.assertIn(foo1, simple_foo.get(**kwargs))
+        foo2 = Foo.objects.create(**kwargs)
+        with mock.patch.object(simple_foo, "invalidation_strategy", DELETE):
+            invalidate(simple_foo, kwargs)
+        self.assertIsNone(cache.get(key))
+        self.assertFalse(CreatedCache.objects.filter(key=key).exists())
+        self.assertIn(foo2, simple_foo.get(**kwargs))
+        self.assertTrue(CreatedCache.objects.filter(key=key).exists())
+        cache.clear()
+
+    def test_rebuild_if_hot_invalidation_strategy(self):
+        hot_kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        cold_kwargs = dict(attr1=2, attr2="test", attr3=1.1)
+        Foo.objects.create(**hot_kwargs)
+        Foo.objects.create(**cold_kwargs)
+        hot_foo_cache.save(**hot_kwargs)
+        hot_foo_cache.save(**cold_kwargs)
+        for _ in range(2):
+            hot_foo_cache.get(**hot_kwargs)
+        hot_foo_cache.get(**cold_kwargs)
+        invalidate_all_cache("hot_foo_cache")
+        self.assertTrue(cache.get(hot_foo_cache.get_key(**hot_kwargs)))
+        self.assertIsNone(cache.get(hot_foo_cache.get_key(**cold_kwargs)))
+        self.assertEqual(
+            list(CreatedCache.objects.filter(label="hot_foo_cache").values_list("key", flat=True)),
+            [hot_foo_cache.get_key(**hot_kwargs)]
+        )
+        cache.clear()
+
+    def test_generations_clear_all(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        with mock.patch.object(simple_foo, "generations", True):
+            key = simple_foo.get_key(**kwargs)
+            self.assertIn(foo1, simple_foo.get(**kwargs))
+            foo2 = Foo.objects.create(**kwargs)
+            self.assertNotIn(foo2, simple_foo.get(**kwargs))
+            clear_all("simple_foo")
+            self.assertNotEqual(simple_foo.get_key(**kwargs), key)
+            self.assertIn(foo2, simple_foo.get(**kwargs))
+            # Invalidation replaces logs of previous generation
+            invalidate_all_cache("simple_foo")
+            self.assertEqual(
+                list(CreatedCache.objects.values_list("key", flat=True)),
+                [simple_foo.get_key(**kwargs)]
+            )
+        cache.clear()
+
+    def test_codecs(self):
+        now = datetime.now().replace(microsecond=0)
+        entity = CachedEntity(
+            label="simple_foo", key="simple_foo@key", expires=20, is_relevance_invalidation=True,
+            created_at=now, relevance_to=now, available_to=now, value=["value"] * 1000
+        )
+        for codec in CODECS.values():
+            data = codec.encode(entity)
+            self.assertEqual(decode(data), entity)
+            # All formats are readable by every codec
+            for other_codec in CODECS.values():
+                self.assertEqual(other_codec.decode(data), entity)
+        self.assertLess(len(CODECS["zlib"].encode(entity)), len(pickle.dumps(entity.to_cache())) / 10)
+        # Build time is written only when known, envelope stays readable by old versions
+        self.assertEqual(len(CODECS["tuple"].encode(entity)), 9)
+        self.assertNotIn("build_time", CODECS["dict"].encode(entity))
+        timed_entity = entity._replace(build_time=0.5)
+        for codec in CODECS.values():
+            self.assertEqual(decode(codec.encode(timed_entity)), timed_entity)
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        with mock.patch.object(simple_foo, "codec", CODECS["lzma"]):
+            self.assertIn(foo1, simple_foo.get(**kwargs))
+            self.assertIsInstance(cache.get(simple_foo.get_key(**kwargs)), bytes)
+            self.assertIn(foo1, simple_foo.get(**kwargs))
+            self.assertIn(foo1, simple_foo.get_many([kwargs])[0])
+        cache.clear()
+
+    def test_chunked_codec(self):
+        codec = ChunkedCodec(ZLIB_MARKER, chunk_size=64)
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foos = [Foo.objects.create(**kwargs) for _ in range(5)]
+        key = simple_foo.get_key(**kwargs)
+        with mock.patch.object(simple_foo, "codec", codec):
+            self.assertEqual(list(simple_foo.get(**kwargs)), foos)
+            manifest = cache.get(key)
+            self.assertEqual(manifest[0], CHUNKED_ENVELOPE)
+            self.assertGreater(manifest[3], 1)
+            # Hit is read with one `get_many` of parts
+            self.assertEqual(list(simple_foo.get(**kwargs)), foos)
+            self.assertEqual(list(decode(manifest).value), foos)
+            # New version doesn't touch parts of served one
+            simple_foo.save(**kwargs)
+            self.assertNotEqual(cache.get(key)[2], manifest[2])
+            self.assertEqual(list(decode(manifest).value), foos)
+            cache.delete(get_chunk_key(key, manifest[2], 1))
+            self.assertIsNone(decode(manifest))
+            # Parts of replaced version are deleted after the gap
+            served = cache.get(key)
+            timers = []
+
+            def expire(manifest):
+                timers.append(expire_chunks(manifest))
+
+            with mock.patch("django_cache.contrib.settings.CHUNK_EXPIRES_GAP", 0), \
+                    mock.patch("django_cache.contrib.codecs.expire_chunks", side_effect=expire):
+                simple_foo.save(**kwargs)
+            timers[0].join()
+            self.assertIsNone(cache.get(get_chunk_key(key, served[2], 0)))
+            self.assertEqual(list(simple_foo.get(**kwargs)), foos)
+            self.assertLess(len(get_chunk_key("k" * 250, served[2], 1000)), 100)
+            # Serialization doesn't write parts
+            with mock.patch.object(cache, "set_many", side_effect=AssertionError):
+                self.assertEqual(list(decode(codec.dumps(decode(cache.get(key)))).value), foos)
+            # Async getting doesn't read parts with blocking calls
+            with mock.patch("django_cache.contrib.codecs.load_chunks", side_effect=AssertionError):
+                self.assertEqual(list(async_to_sync(simple_foo.aget)(**kwargs)), foos)
+                cache.delete(key)
+                self.assertEqual(list(async_to_sync(simple_foo.aget)(**kwargs)), foos)
+                self.assertEqual(list(async_to_sync(simple_foo.aget_many)([kwargs])[0]), foos)
+            with mock.patch.object(simple_foo, "cached_entity", True):
+                self.assertEqual(list(simple_foo.get(**kwargs).value), foos)
+        cache.clear()
+
+    def test_materialization(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        foo2 = Foo.objects.create(**kwargs)
+        key = simple_foo.get_key(**kwargs)
+        with mock.patch.object(simple_foo, "materialization", IDS):
+            self.assertEqual(simple_foo.save(**kwargs), [foo1, foo2])
+            self.assertEqual(cache.get(key)["value"], ModelIds("foo.Foo", [foo1.id, foo2.id]))
+            foo2.attr2 = "changed"
+            foo2.save()
+            self.assertEqual(simple_foo.get(**kwargs)[1].attr2, "changed")
+            # Instances of all hits are fetched by one query
+            foo3 = Foo.objects.create(**{**kwargs, "attr1": 2})
+            simple_foo.save(**kwargs)
+            simple_foo.save(**{**kwargs, "attr1": 2})
+            with self.assertNumQueries(1):
+                self.assertEqual(simple_foo.get_many([kwargs, {**kwargs, "attr1": 2}]), [[foo1], [foo3]])
+        with mock.patch.object(simple_foo, "materialization", VALUES_LIST):
+            simple_foo.save(**kwargs)
+            self.assertEqual(simple_foo.get(**kwargs), [(foo1.id, 1, "test", 1.1)])
+        with mock.patch.object(simple_foo, "materialization", VALUES):
+            simple_foo.save(**kwargs)
+            self.assertEqual(simple_foo.get(**kwargs)[0]["id"], foo1.id)
+        cache.clear()
+
+    def test_async_api(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        self.assertIn(foo1, async_to_sync(aget_cache)("simple_foo", **kwargs))
+        self.assertIn(foo1, simple_foo.get(**kwargs))
+        foo2 = Foo.objects.create(**kwargs)
+        self.assertNotIn(foo2, async_to_sync(simple_foo.aget)(**kwargs))
+        self.assertIn(foo2, async_to_sync(simple_foo.asave)(**kwargs))
+        other_kwargs = dict(attr1=2, attr2="other", attr3=2.2)
+        foo3 = Foo.objects.create(**other_kwargs)
+        self.assertEqual(
+            [list(foos) for foos in async_to_sync(aget_cache_many)("simple_foo", [kwargs, other_kwargs])],
+            [[foo1, foo2], [foo3]]
+        )
+        foo3.attr2 = "test"
+        foo3.save()
+        async_to_sync(ainvalidate_cache)("simple_foo", other_kwargs, dict(attr2="test"))
+        self.assertNotIn(foo3, simple_foo.get(**other_kwargs))
+        foo4 = Foo.objects.create(**kwargs)
+        async_to_sync(simple_foo.ainvalidate)(kwargs)
+        self.assertIn(foo4, simple_foo.get(**kwargs))
+        foo5 = Foo.objects.create(**kwargs)
+        async_to_sync(simple_foo.ainvalidate_all)()
+        self.assertIn(foo5, simple_foo.get(**kwargs))
+
+        async def get_foos(**kwargs):
+            return await sync_to_async(list)(Foo.objects.filter(**kwargs))
+
+        with mock.patch.object(simple_foo, "structure_getter", get_foos):
+            self.assertEqual(async_to_sync(simple_foo.aget)(attr1=2), [foo3])
+        # Local cache version is checked without blocking calls
+        local_foo_cache.clear_local()
+        with mock.patch.object(local_foo_cache.local_cache, "refresh", side_effect=AssertionError), \
+                mock.patch.object(local_foo_cache.local_cache, "check_interval", 0):
+            self.assertEqual(list(async_to_sync(local_foo_cache.aget)(**kwargs)), [foo1, foo2, foo4, foo5])
+            self.assertEqual(list(async_to_sync(local_foo_cache.aget_many)([kwargs])[0]), [foo1, foo2, foo4, foo5])
+        cache.clear()
+
+    def test_typed_keygen(self):
+        # Falsy and differently typed values give different keys
+        keys = {typed_keygen(attr=value) for value in (0, False, "", None, "0", 0.0, [])}
+        self.assertEqual(len(keys), 7)
+        # Lists and tuples are equal, so keys are same after logging attributes as json
+        self.assertEqual(typed_keygen(attr=(1, 2)), typed_keygen(attr=[1, 2]))
+        self.assertEqual(keygen(attr=0), keygen(attr=None))
+        self.assertEqual(typed_keygen(b=1, a="x"), typed_keygen(a="x", b=1))
+        self.assertEqual(typed_keygen(attr={2, 1}), typed_keygen(attr={1, 2}))
+        self.assertNotEqual(typed_keygen(1, "a"), typed_keygen("a", 1))
+        self.assertNotEqual(typed_keygen(attr="a,b"), typed_keygen(attr=["a", "b"]))
+        # Long and not memcached safe keys are hashed
+        self.assertEqual(len(typed_keygen(ids=list(range(1000)))), 33)
+        self.assertTrue(typed_keygen(attr="with space").startswith("#"))
+        self.assertEqual(len(TypedKeygen(max_length=10)(attr="long value")), 33)
+        self.assertTrue(hashed_keygen(attr=1).startswith("#"))
+        # Parts are hashed without joining, digest is same as of readable key
+        for args, kwargs in (((1, "a"), dict(ids=[3, 1], names=["x", "y"])), ((), {}), ((True, ), {})):
+            self.assertEqual(hashed_keygen(*args, **kwargs), hashed_keygen.digest(typed_keygen(*args, **kwargs)))
+        self.assertEqual(typed_keygen(attr=[1, True]), "attr=(i1,T)")
+        self.assertEqual(typed_keygen(attr=[Decimal("1.50"), Decimal("2")]), "attr=(d1.5,d2)")
+        worker = CacheWorker(
+            structure_getter=simple_foo.structure_getter,
+            label="hashed_foo",
+            expires=10,
+            key_gen="hashed",
+            is_register=False
+        )
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        self.assertEqual(worker.get_key(**kwargs), f"hashed_foo@{hashed_keygen(**kwargs)}")
+        self.assertIn(foo1, worker.get(**kwargs))
+        cache.clear()
+
+    def test_fast_hit(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        self.assertIs(simple_foo.local_settings, simple_foo.local_settings)
+        simple_foo.get(**kwargs)
+        with mock.patch("django_cache.contrib.codecs.decode") as decode_mock:
+            self.assertIn(foo1, simple_foo.get(**kwargs))
+        decode_mock.assert_not_called()
+        for codec in CODECS.values():
+            with mock.patch.object(simple_foo, "codec", codec):
+                simple_foo.save(**kwargs)
+                self.assertIn(foo1, simple_foo.get(**kwargs))
+        # Settings are compiled again after attribute change
+        with mock.patch.object(simple_foo, "cached_entity", True):
+            self.assertFalse(simple_foo.is_plain_value)
+            self.assertIsInstance(simple_foo.get(**kwargs), CachedEntity)
+        self.assertTrue(simple_foo.is_plain_value)
+        with mock.patch.object(simple_foo, "tick", 5):
+            self.assertEqual(simple_foo.local_settings.tick, 5)
+        # Overrides are parsed and not passed to key generator
+        self.assertIn(foo1, simple_foo.get(relevance_invalidation=True, **kwargs))
+        cache.clear()
+
+    def test_metrics(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        Foo.objects.create(**kwargs)
+        collector.reset()
+        simple_foo.get(**kwargs)
+        self.assertEqual(collector.snapshot(), {})
+        events = []
+
+        def receiver(sender, signal, **event):
+            events.append(event)
+
+        cache_event.connect(receiver)
+        observers.extend([collector, send_signal])
+        try:
+            simple_foo.get(**kwargs)
+            simple_foo.get_many([kwargs, dict(kwargs, attr1=2)])
+            invalidate_cache("simple_foo", kwargs, dict(attr1=3))
+        finally:
+            observers.clear()
+            cache_event.disconnect(receiver)
+        snapshot = collector.snapshot()["simple_foo"]
+        self.assertEqual(snapshot[HIT]["count"], 2)
+        self.assertEqual(snapshot[MISS]["count"], 1)
+        self.assertEqual(sum(snapshot[MISS]["buckets"].values()), 1)
+        # Count of rebuilt values
+        self.assertEqual(snapshot[INVALIDATION]["count"], 1)
+        self.assertEqual(snapshot["hit_ratio"], 2 / 3)
+        self.assertEqual(len(events), 4)
+        self.assertEqual(events[0], {"label": "simple_foo", "event": HIT, "duration": None, "count": 1})
+        response = self.client.get("/cache/metrics/")
+        self.assertIn(b'django_cache_events_total{label="simple_foo",event="hit"} 2', response.content)
+        self.assertIn(b'django_cache_duration_seconds_count{label="simple_foo",event="miss"} 1', response.content)
+        # Label values are escaped
+        escaped = MetricsCollector((0.1, ))
+        escaped('say "hi"\\\n', HIT, 0.05, 1)
+        self.assertIn(
+            'django_cache_duration_seconds_bucket{label="say \\"hi\\"\\\\\\n",event="hit",le="0.1"} 1',
+            escaped.to_prometheus()
+        )
+        # Metrics published by processes are summed
+        with mock.patch.object(collector, "publish_interval", 10):
+            collector.publish()
+        out = StringIO()
+        call_command("cache_metrics", format="json", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["simple_foo"][HIT]["count"], 2)
+        collector.reset()
+        cache.clear()
+
+    def test_early_refresh(self):
+        kwargs = dict(attr1=1, attr2="test", attr3=1.1)
+        foo1 = Foo.objects.create(**kwargs)
+        key = simple_foo.get_key(**kwargs)
+        with mock.patch.object(simple_foo, "early_refresh", True), \
+                mock.patch("django_cache.contrib.cache.revalidate") as revalidate_mock:
+            simple_foo.save(**kwargs)
+            entity = decode(cache.get(key))
+            self.assertGreater(entity.build_time, 0)
+            self.assertIn(foo1, simple_foo.get(**kwargs))
+            revalidate_mock.assert_not_called()
+            # Long building value is refreshed long before expiration
+            cache.set(key, entity._replace(build_time=100).to_cache())
+            with mock.patch("random.random", return_value=0.5):
+                self.assertIn(foo1, simple_foo.get(**kwargs))
+            revalidate_mock.assert_called_once_with(key, simple_foo.lock_expires, is_delay=False)
+            # Old values without build time are not refreshed
+            cache.set(key, {**entity.to_cache(), "build_time": 0})
+            simple_foo.get(**kwargs)
+            self.assertEqual(revalidate_mock.call_count, 1)
+        with mock.patch.object(simple_foo, "expires_jitter", 0.5):
+            expires = set()
+            for _ in range(20):
+                simple_foo.save(**kwargs)
+                expires.add(decode(cache.get(key)).expires)
+            self.assertGreater(len(expires), 1)
+            self.assertTrue(all(10 <= value <= 20 for value in expires))
+            # Batch values are written with own expires
+            with mock.patch.object(cache, "set_many", wraps=cache.set_many) as set_many:
+                simple_foo.save_many([kwargs, dict(attr1=2, attr2="test", attr3=None)])
+            for (values, timeout), _ in set_many.call_args_list:
+                self.assertTrue(all(decode(value).expires == timeout for value in values.values()))
+        # Dict format is not changed without early refresh
+        self.assertNotIn("build_time", cache.get(key))
+        cache.clear()
+
+    def test_warm_cache(self):
+        arguments = [dict(attr1=i, attr2="test", attr3=1.1) for i in range(3)]
+        foos = [Foo.objects.create(**kwargs) for kwargs in arguments]
+        for kwargs in arguments:
+            simple_foo.get(**kwargs)
+        keys = simple_foo.get_keys(arguments)
+        cache.clear()
+
+        def warm_cache(*args):
+            out = StringIO()
+            call_command("warm_cache", "simple_foo", *args, stdout=out)
+            return out.getvalue().strip()
+
+        self.assertEqual(warm_cache("--limit", "1"), "simple_foo: 1 values warmed")
+        # Recently built first
+        self.assertEqual(list(cache.get_many(keys)), [keys[2]])
+        self.assertEqual(warm_cache(), "simple_foo: 2 values warmed")
+        self.assertEqual(len(cache.get_many(keys)), 3)
+        self.assertIn(foos[0], simple_foo.get(**arguments[0]))
+        self.assertEqual(warm_cache(), "simple_foo: 0 values warmed")
+        self.assertEqual(warm_cache("--all", "--workers", "1"), "simple_foo: 3 values warmed")
+        cache.clear()
+        cache.set(get_hits_key(keys[1]), 5)
+        # Hits are counted only by rebuild_if_hot workers
+        err = StringIO()
+        call_command("warm_cache", "simple_foo", "--order", "hits", stdout=StringIO(), stderr=err)
+        self.assertEqual(err.getvalue().strip(), "simple_foo: hits are not counted by worker, skipped")
+        with mock.patch.object(simple_foo, "invalidation_strategy", "rebuild_if_hot"):
+            self.assertEqual(warm_cache("--order", "hits", "--limit", "1"), "simple_foo: 1 values warmed")
+            self.assertIn(keys[1], cache.get_many(keys))
+            self.assertNotIn(keys[0], cache.get_many(keys))
+            cache.set(get_hits_key(keys[0]), 3)
+            self.assertEqual(
+                [key for key, _ in get_warm_up_items(simple_foo, HITS)], [keys[1], keys[0], keys[2]]
+            )
+            self.assertEqual([key for key, _ in get_warm_up_items(simple_foo, HITS, 2)], [keys[1], keys[0]])
+        cache.clear()
+
+
+class RebuildTestCase(TransactionTestCase):
+
+    def test_parallel_rebuild(self):
+        arguments = [dict(attr1=index, attr2="test", attr3=None) for index in range(5)]
+        for kwargs in arguments:
+            Foo.objects.create(**kwargs)
+        simple_foo.get_many(arguments)
+        new_foos = [Foo.objects.create(**kwargs) for kwargs in arguments]
+        result = rebuild_created_caches(
+            simple_foo, CreatedCache.objects.filter(label="simple_foo"), batch_size=2, workers=3
+        )
+        self.assertEqual(result, RebuildResult(rebuilt=5, deleted=0))
+        self.assertEqual(CreatedCache.objects.filter(label="simple_foo").count(), 5)
+        for foo, kwargs in zip(new_foos, arguments):
+            self.assertIn(foo, simple_foo.get(**kwargs))
+        # Cold values are only deleted
+        result = rebuild_created_caches(
+            simple_foo, CreatedCache.objects.filter(label="simple_foo"), batch_size=2, workers=3, strategy=DELETE
+        )
+        self.assertEqual(result, RebuildResult(rebuilt=0, deleted=5))
+        self.assertFalse(CreatedCache.objects.filter(label="simple_foo").exists())
+        cache.clear()
+
+    def test_rate_limit(self):
+        started = time.monotonic()
+        self.assertEqual(len(list(rate_limited([[1, 2]] * 3, rate_limit=20))), 3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
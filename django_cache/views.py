@@ -0,0 +1,9 @@
+from django.http import HttpResponse
+
+from .contrib.metrics import collector, load_published
+
+
+def metrics(request):
+    # Prometheus text exposition format, `?published=1` for metrics of all processes
+    source = load_published() if request.GET.get("published") else collector
+    return HttpResponse(source.to_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -5,7 +5,7 @@ from django_cache.contrib import (
     default_newcomers_getter
 )
 from django_cache.shortcuts import get_cache_worker
-from .getters import get_foo, get_bar, get_foo_with_nested
+from .getters import get_foo, get_foo_many, get_bar, get_foo_with_nested, get_foo_with_tagged_bars
 
 from .models import Foo, Bar
 
@@ -14,6 +14,7 @@ simple_foo = CacheWorker(
     structure_getter=get_foo,
     label='simple_foo',
     expires=20,
+    many_structure_getter=get_foo_many,
 )
 workers_collection.register(
     structure_getter=get_bar,
@@ -34,12 +35,39 @@ fast_foo_timeout_cache = CacheWorker(
     relevance_invalidation=True,
     relevance_expires=1,
 )
+local_foo_cache = CacheWorker(
+    structure_getter=get_foo,
+    label="local_foo_cache",
+    expires=10,
+    local_cache=True,
+    local_cache_size=2,
+)
+hot_foo_cache = CacheWorker(
+    structure_getter=get_foo,
+    label="hot_foo_cache",
+    expires=10,
+    invalidation_strategy="rebuild_if_hot",
+    hot_hits=2,
+)
 nested_foo_cache = CacheWorker(
     structure_getter=get_foo_with_nested,
     label="nested_foo_cache",
     expires=10,
 )
 
+delta_bar_cache = CacheWorker(
+    structure_getter=get_bar,
+    label="delta_bar_cache",
+    expires=10,
+    apply_delta="instances",
+)
+tagged_foo_cache = CacheWorker(
+    structure_getter=get_foo_with_tagged_bars,
+    label="tagged_foo_cache",
+    expires=10,
+    invalidation_strategy="delete",
+)
+
 
 automatic_invalidation.register(
     Bar, {
@@ -48,6 +76,9 @@ automatic_invalidation.register(
                 "attr1": instance.attr1, "attr2": instance.attr2, "attr3": instance.attr3
             },
         },
+        "delta_bar_cache": {
+            "instance_getter": lambda instance: {"attr1": instance.attr1, "attr2": instance.attr2},
+        },
         "nested_foo_cache": {
             "instance_getter": lambda instance: {"bars": instance.id},
             "outdated_getter": default_outdated_getter(["bars", "id"]),
@@ -60,3 +91,4 @@ automatic_invalidation.register(
         "all_foos": {"is_empty": True}
     }
 )
+automatic_invalidation.register_tags(Bar)
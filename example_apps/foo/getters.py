@@ -1,3 +1,10 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from django_cache.contrib.tags import add_tags
+
 from example_apps.foo.models import Foo, Bar
 
 
@@ -5,6 +12,14 @@ def get_foo(attr1, attr2, attr3):
     return Foo.objects.filter(attr1=attr1, attr2=attr2, attr3=attr3)
 
 
+def get_foo_many(arguments):
+    foos = list(Foo.objects.filter(reduce(or_, (Q(**kwargs) for kwargs in arguments))))
+    return [
+        [foo for foo in foos if all(getattr(foo, key) == value for key, value in kwargs.items())]
+        for kwargs in arguments
+    ]
+
+
 def get_bar(**kwargs):
     return Bar.objects.filter(**kwargs)
 
@@ -13,5 +28,10 @@ def get_foo_with_nested(bars, attr1):
     return Foo.objects.filter(bars__in=bars, attr1=attr1).distinct()
 
 
+def get_foo_with_tagged_bars(bars, attr1):
+    add_tags(*(("foo.Bar", bar) for bar in bars))
+    return Foo.objects.filter(bars__in=bars, attr1=attr1).distinct()
+
+
 def get_all_foo():
     return Foo.objects.all()
\ No newline at end of file
@@ -1,7 +1,10 @@
 from django.conf.urls import url
 from django.contrib import admin
 
+from django_cache.views import metrics
+
 
 urlpatterns = [
     url(r'^admin/', admin.site.urls),
+    url(r'^cache/metrics/$', metrics),
 ]